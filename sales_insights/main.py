@@ -25,7 +25,8 @@ async def main(nlp_input):
     # Immport NLP to SQL Plugin
     plugins_directory = "plugins"
     kernel.import_semantic_plugin_from_directory(plugins_directory, "nlpToSqlPlugin")
-    kernel.import_plugin(plugin.QueryDbPlugin(os.getenv("CONNECTION_STRING")), plugin_name="QueryDbPlugin")
+    query_db_plugin = plugin.QueryDbPlugin(os.getenv("CONNECTION_STRING"))
+    kernel.import_plugin(query_db_plugin, plugin_name="QueryDbPlugin")
     
     # create an instance of sequential planner
     planner = SequentialPlanner(kernel)    
@@ -33,11 +34,15 @@ async def main(nlp_input):
     # Create a plan with the NLP input (the ask for which the sequential planner is going to find a relevant function.)
     ask = f"Create a SQL query according to the following request: {nlp_input} and query the database to get the result."   
 
-    #ask the sequential planner to identify a suitable function from the list of functions available.
-    plan = await planner.create_plan(goal=ask)   
+    try:
+        #ask the sequential planner to identify a suitable function from the list of functions available.
+        plan = await planner.create_plan(goal=ask)   
  
-    # Invoke the plan and get the result
-    result = await plan.invoke(kernel=kernel)   
+        # Invoke the plan and get the result
+        result = await plan.invoke(kernel=kernel)   
+    finally:
+        # Close the pooled database connections
+        query_db_plugin.close()
 
 
     print('/n')
@@ -1,53 +1,195 @@
 from semantic_kernel.plugin_definition import kernel_function, kernel_function_context_parameter
 from semantic_kernel import KernelContext
 
+import threading
+import time
+from contextlib import contextmanager
+
 import pyodbc
 
 
+class ConnectionPool:
+    """
+    Description: Reuse open database connections instead of connecting for every query
+    """
+    def __init__(self, connection_string: str, min_size: int = 1, max_size: int = 5,
+                 idle_timeout_seconds: float = 300, health_check_after_seconds: float = 30,
+                 acquire_timeout_seconds: float = 30) -> None:
+        self._connection_string = connection_string
+        # min_size connections are opened up front so the first queries do not pay the connect
+        # cost, and kept open; idle connections beyond min_size are closed after idle_timeout_seconds
+        self.min_size = min_size
+        # At most max_size connections are open; further queries wait for one to be released
+        self.max_size = max_size
+        self.idle_timeout_seconds = idle_timeout_seconds
+        # A connection idle for longer than this is checked with SELECT 1 before it is reused
+        self.health_check_after_seconds = health_check_after_seconds
+        self.acquire_timeout_seconds = acquire_timeout_seconds
+
+        # (connection, last used) pairs, most recently used last
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._lock = threading.Condition()
+        self._open_min_connections()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout_seconds
+        while True:
+            idle = self._take(deadline)
+            if idle is None:
+                break
+            conn, last_used = idle
+            if time.monotonic() - last_used < self.health_check_after_seconds or self._is_healthy(conn):
+                return conn
+            with self._lock:
+                self._discard(conn)
+                self._lock.notify()
+
+        try:
+            return pyodbc.connect(self._connection_string)
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, conn) -> None:
+        try:
+            # End the query's transaction so the next user starts clean, as closing used to
+            conn.rollback()
+        except pyodbc.Error:
+            with self._lock:
+                self._discard(conn)
+                self._lock.notify()
+            return
+
+        with self._lock:
+            if self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+            self._lock.notify_all()
+
+    def _take(self, deadline: float):
+        # Return an idle (connection, last used) pair, or None once a slot for a new connection is reserved
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                self._close_expired()
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No database connection available within {self.acquire_timeout_seconds}s")
+                self._lock.wait(remaining)
+
+    def _open_min_connections(self) -> None:
+        # A database that is down now should not stop the plugin from loading; queries will
+        # connect on demand (and report the error) once it is reachable
+        while self._size < min(self.min_size, self.max_size):
+            try:
+                conn = pyodbc.connect(self._connection_string)
+            except pyodbc.Error:
+                return
+            self._size += 1
+            self._idle.append((conn, time.monotonic()))
+
+    @staticmethod
+    def _is_healthy(conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1").fetchone()
+            finally:
+                cursor.close()
+            return True
+        except pyodbc.Error:
+            return False
+
+    def _close_expired(self) -> None:
+        # The oldest idle connections are at the front
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.idle_timeout_seconds:
+            self._discard(self._idle.pop(0)[0])
+
+    def _discard(self, conn) -> None:
+        self._size -= 1
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+
+
 class QueryDbPlugin:
     """
     Description: Get the result of a SQL query
     """
-    def __init__(self, connection_string: str) -> None:
+    def __init__(self, connection_string: str, min_connections: int = 1, max_connections: int = 5,
+                 idle_timeout_seconds: float = 300) -> None:
         self._connection_string = connection_string
-    
+        # Connecting to Azure SQL often takes longer than the query itself, so connections are reused
+        self._pool = ConnectionPool(connection_string, min_size=min_connections, max_size=max_connections,
+                                    idle_timeout_seconds=idle_timeout_seconds)
+
+    def close(self) -> None:
+        self._pool.close()
+
     @staticmethod
     def __clean_sql_query__(sql_query):
         sql_query = sql_query.replace(";", "")
         sql_query = sql_query.replace("/n ", " ")
 
-        return sql_query  
-    
+        return sql_query
+
     @kernel_function(name="query_db",
                      description="Query a database using a SQL query")
     @kernel_function_context_parameter(name="input",
                                        description="SQL Query to be executed")
-    
-    def query_db(self, context: KernelContext) -> str:         
-        # Connect to the SQL Server database
-        conn = pyodbc.connect(self._connection_string)
-
-        # Create a cursor object to execute SQL queries
-        cursor = conn.cursor()
-        
-        try:            
-            cursor.execute(self.__clean_sql_query__(context["input"]))
-            #result = cursor.fetchone()
-            
-            # Get the column names from cursor.description
-            columns = [column[0] for column in cursor.description]
-
-            # Initialize an empty list to store the results as dictionaries
-            results = []
-
-            # Fetch all rows and create dictionaries
-            for row in cursor.fetchall():
-                results.append(dict(zip(columns, row)))
-            
+
+    def query_db(self, context: KernelContext) -> str:
+        try:
+            # Borrow a connection from the pool; it is returned even when the query fails
+            with self._pool.connection() as conn:
+                # Create a cursor object to execute SQL queries
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(self.__clean_sql_query__(context["input"]))
+                    #result = cursor.fetchone()
+
+                    # Get the column names from cursor.description
+                    columns = [column[0] for column in cursor.description]
+
+                    # Initialize an empty list to store the results as dictionaries
+                    results = []
+
+                    # Fetch all rows and create dictionaries
+                    for row in cursor.fetchall():
+                        results.append(dict(zip(columns, row)))
+                finally:
+                    cursor.close()
+
             context["result"] = results
         except Exception as e:
             return f"Error: {e}"
-        cursor.close()
-        conn.close()
-        
+
         return str(results)
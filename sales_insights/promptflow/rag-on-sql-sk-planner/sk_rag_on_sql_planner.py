@@ -14,6 +14,14 @@ import json
 def to_json(obj):
     return json.dumps(obj, default=lambda obj: obj.__dict__)
 
+# One QueryDbPlugin (and its connection pool) per connection string, reused across flow runs
+_query_db_plugins = {}
+
+def get_query_db_plugin(sql_conn_string: str):
+    if sql_conn_string not in _query_db_plugins:
+        _query_db_plugins[sql_conn_string] = plugin.QueryDbPlugin(sql_conn_string)
+    return _query_db_plugins[sql_conn_string]
+
 # The inputs section will change based on the arguments of the tool function, after you save the code
 # Adding type to arguments and return value will help the system show the types properly
 # Please update the function name/signature per need
@@ -34,7 +42,7 @@ async def my_python_tool(ask: str, aoai_deployment: str, conn: CustomConnection)
      # Immport NLP to SQL Plugin
     plugins_directory = "plugins"
     kernel.import_semantic_plugin_from_directory(plugins_directory, "nlpToSqlPlugin")
-    kernel.import_plugin(plugin.QueryDbPlugin(sql_conn_string), plugin_name="QueryDbPlugin")
+    kernel.import_plugin(get_query_db_plugin(sql_conn_string), plugin_name="QueryDbPlugin")
 
     # create an instance of sequential planner
     planner = SequentialPlanner(kernel)    
@@ -0,0 +1,205 @@
+import asyncio
+import functools
+import hashlib
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from azure.ai.projects.models import AsyncFunctionTool, AsyncToolSet, BingGroundingTool
+
+# The timings of the request running in the current task; tool wrappers add their durations here
+_current_timings: ContextVar[Optional["RequestTimings"]] = ContextVar(
+    "current_timings", default=None)
+
+
+@dataclass
+class RequestTimings:
+    """Per-request latency breakdown, in seconds."""
+    agent_seconds: float = 0.0
+    run_seconds: float = 0.0
+    tool_seconds: Dict[str, float] = field(default_factory=dict)
+    tool_calls: int = 0
+
+    @property
+    def total_tool_seconds(self) -> float:
+        return sum(self.tool_seconds.values())
+
+    def as_dict(self) -> dict:
+        return {
+            "agent_seconds": round(self.agent_seconds, 3),
+            "run_seconds": round(self.run_seconds, 3),
+            "tool_seconds": {name: round(seconds, 3) for name, seconds in self.tool_seconds.items()},
+            "tool_calls": self.tool_calls,
+        }
+
+
+def timed_tool(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wraps an async tool function so each call is added to the current request's timings."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            timings = _current_timings.get()
+            if timings is not None:
+                timings.tool_calls += 1
+                timings.tool_seconds[func.__name__] = timings.tool_seconds.get(
+                    func.__name__, 0.0) + time.perf_counter() - start
+    return wrapper
+
+
+class AgentPool:
+    """
+    Keeps agents alive across requests instead of creating and deleting one per conversation.
+
+    Agents are keyed by (model, hash of the instructions, tool set). A request with the same
+    configuration reuses the existing agent on a new thread; a changed configuration creates a
+    new agent. The Bing connection is looked up once per connection name. All agents created by
+    the pool are deleted by `close()`.
+    """
+
+    def __init__(self, project_client, name: str = "travel-recommender", headers: Optional[dict] = None):
+        self._project_client = project_client
+        self._name = name
+        self._headers = headers or {"x-ms-enable-preview": "true"}
+        self._agents = {}
+        self._bing_connection_ids = {}
+        self._lock = asyncio.Lock()
+        self._logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def _get_key(model: str, instructions: str, functions: Iterable[Callable], bing_connection_name: Optional[str]):
+        instructions_hash = hashlib.sha256(
+            instructions.encode("utf-8")).hexdigest()
+        tools = tuple(sorted(func.__name__ for func in functions))
+        return model, instructions_hash, tools, bing_connection_name or ""
+
+    async def _get_bing_connection_id(self, connection_name: str) -> Optional[str]:
+        if connection_name not in self._bing_connection_ids:
+            try:
+                bing_connection = await self._project_client.connections.get(
+                    connection_name=connection_name)
+                self._bing_connection_ids[connection_name] = bing_connection.id
+            except Exception as e:
+                self._logger.warning("Failed to add Bing tool: %s", e)
+                self._bing_connection_ids[connection_name] = None
+        return self._bing_connection_ids[connection_name]
+
+    async def get_agent(
+        self,
+        model: str,
+        instructions: str,
+        functions: Iterable[Callable],
+        bing_connection_name: Optional[str] = None,
+    ):
+        """
+        Returns an agent for the configuration, creating it only on the first request.
+
+        Args:
+            model (str): The model deployment name.
+            instructions (str): The agent instructions.
+            functions (Iterable[Callable]): The async tool functions available to the agent.
+            bing_connection_name (str, optional): The Bing grounding connection to add, if any.
+
+        Returns:
+            Agent: The pooled agent.
+        """
+        functions = list(functions)
+        key = self._get_key(model, instructions,
+                            functions, bing_connection_name)
+        async with self._lock:
+            agent = self._agents.get(key)
+            if agent is not None:
+                return agent
+
+            self._logger.info(
+                "Creating %s agent for model %s (instructions %s)...", self._name, model, key[1][:12])
+            toolset = AsyncToolSet()
+            toolset.add(AsyncFunctionTool(
+                functions={timed_tool(func) for func in functions}))
+            if bing_connection_name:
+                connection_id = await self._get_bing_connection_id(bing_connection_name)
+                if connection_id:
+                    toolset.add(BingGroundingTool(connection_id=connection_id))
+
+            agent = await self._project_client.agents.create_agent(
+                model=model,
+                name=self._name,
+                instructions=instructions,
+                toolset=toolset,
+                headers=self._headers,
+            )
+            self._logger.info("Created agent, ID: %s", agent.id)
+            self._agents[key] = agent
+            return agent
+
+    async def run(
+        self,
+        model: str,
+        instructions: str,
+        functions: Iterable[Callable],
+        content: str,
+        role,
+        bing_connection_name: Optional[str] = None,
+    ):
+        """
+        Runs one request on a pooled agent in a new thread.
+
+        Args:
+            model (str): The model deployment name.
+            instructions (str): The agent instructions.
+            functions (Iterable[Callable]): The async tool functions available to the agent.
+            content (str): The user message.
+            role (MessageRole): The role of the message sender.
+            bing_connection_name (str, optional): The Bing grounding connection to add, if any.
+
+        Returns:
+            tuple: The thread ID, the completed run and the `RequestTimings` of the request.
+        """
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        try:
+            start = time.perf_counter()
+            agent = await self.get_agent(model, instructions, functions, bing_connection_name)
+            timings.agent_seconds = time.perf_counter() - start
+
+            thread = await self._project_client.agents.create_thread()
+            try:
+                await self._project_client.agents.create_message(
+                    thread_id=thread.id, role=role, content=content)
+
+                start = time.perf_counter()
+                run = await self._project_client.agents.create_and_process_run(
+                    thread_id=thread.id, agent_id=agent.id)
+                timings.run_seconds = time.perf_counter() - start
+            except BaseException:
+                # The caller only gets the thread ID on success, so clean up the thread here
+                await self._delete_thread(thread.id)
+                raise
+        finally:
+            _current_timings.reset(token)
+
+        self._logger.info("Request on agent %s finished: %s",
+                          agent.id, timings.as_dict())
+        return thread.id, run, timings
+
+    async def _delete_thread(self, thread_id: str):
+        try:
+            await self._project_client.agents.delete_thread(thread_id)
+        except Exception as e:
+            self._logger.warning("Failed to delete thread %s: %s", thread_id, e)
+
+    async def close(self):
+        """Deletes every agent the pool created."""
+        async with self._lock:
+            for agent in self._agents.values():
+                try:
+                    await self._project_client.agents.delete_agent(agent.id)
+                    self._logger.info("Agent %s deleted.", agent.id)
+                except Exception as e:
+                    self._logger.warning(
+                        "Failed to delete agent %s: %s", agent.id, e)
+            self._agents.clear()
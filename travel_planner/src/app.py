@@ -3,13 +3,16 @@ import os
 from pathlib import Path
 import sys
 import logging
-import json
-import uuid
 import asyncio
 from azure.identity.aio import DefaultAzureCredential, get_bearer_token_provider
 from azure.ai.projects.aio import AIProjectClient
-from azure.ai.projects.models import AsyncFunctionTool, AsyncToolSet, BingGroundingTool, MessageRole
+from azure.ai.projects.models import MessageRole
 from content_understanding.content_understanding_client import AzureContentUnderstandingClient
+from content_understanding.blob_store import LocalBlobStore
+from content_understanding.result_cache import AnalysisResultCache, hash_template
+from content_understanding.analyzer_registry import AnalyzerRegistry
+from pdf_renderer import PdfRenderService
+from agent_pool import AgentPool
 from dotenv import load_dotenv
 import config
 logging.basicConfig(level=logging.INFO)
@@ -25,77 +28,65 @@ AZURE_AI_ENDPOINT = os.getenv("AZURE_AI_ENDPOINT")
 AZURE_AI_API_VERSION = os.getenv("AZURE_AI_API_VERSION")
 ITINERARY_FILE = os.getenv(
     "ITINERARY_FILE_URL") or "https://cooking.blob.core.windows.net/travel/travel_itinerary.pdf"
+# Optional stand-in blob store: large local itineraries are uploaded here and analyzed by URL
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR")
+BLOB_STORE_BASE_URL = os.getenv("BLOB_STORE_BASE_URL")
+# Analyze results are cached on disk by document version + analyzer template
+ANALYSIS_CACHE_DIR = os.getenv("ANALYSIS_CACHE_DIR") or Path(
+    os.path.dirname(__file__)) / ".cache" / "analyze_results"
+ANALYSIS_CACHE_TTL_SECONDS = int(
+    os.getenv("ANALYSIS_CACHE_TTL_SECONDS", 7 * 24 * 60 * 60))
+ANALYSIS_CACHE_MAX_BYTES = int(
+    os.getenv("ANALYSIS_CACHE_MAX_BYTES", 256 * 1024 * 1024))
 SAVE_TO_PDF_FILE = Path(os.path.dirname(__file__)) / \
     "output" / "new_itinerary.pdf"
 
 
-async def create_agent_and_process(project_client):
-    """Create an agent with necessary tools and process a conversation."""
-    logging.info("Creating GPT-4o Travel Recommender Agent...")
-
-    # Set up tools
-    toolset = AsyncToolSet()
-    toolset.add(AsyncFunctionTool(functions=travel_functions))
-
-    try:
-        # Get Bing connection
-        bing_connection = await project_client.connections.get(
-            connection_name=os.environ.get("BING_CONNECTION_NAME"))
-        toolset.add(BingGroundingTool(connection_id=bing_connection.id))
-    except Exception as e:
-        logging.warning("Failed to add Bing tool: %s", e)
-
-    # Create agent
-    agent = await project_client.agents.create_agent(
+AGENT_INSTRUCTIONS = (
+    "You are an AI travel assistant. Analyze provided travel itineraries "
+    "and generate engaging, personalized recommendations for destinations, "
+    "activities, dining experiences, and efficient transportation methods. "
+    "Only save the itinerary as a PDF when the user explicitly requests it and says where they want it saved."
+    "When asked to create travel plans based on existing itinerary, "
+    "Create a new, concise travel itinerary with daily schedules for the entire travel duration, "
+    "beginning on the the start date and ending on the end date. "
+    "Provide recommendations for morning, afternoon, and evening activities, including dining options for"
+    "every day of the trip. "
+    "Keep existing plans and add new activities located in areas I'll be in each day."
+    "If I am not in a new city/area, assume I am at the same location as the prior day. "
+    "Search with Bing for popular sites, restaurants, and activities. "
+    "Always include citations for information provided."
+    "Use the following markdown format for the itinerary in your response: "
+    "# Travel Itinerary\n"
+    "## Travel Dates\n"
+    "Start Date: {{start_date}}\n"
+    "End Date: {{end_date}}\n"
+    "## City Name\n"
+    "### June 1, 2022 (Day 1)\n"
+    "- Morning: Breakfast at [Restaurant Name](Restaurant URL)\n"
+    "- Afternoon: Visit [Site Name](Site URL)\n"
+    "- Evening: Dinner at [Restaurant Name](Restaurant URL)\n"
+    "### June 2, 2022 (Day 2)\n"
+    "- Morning: Breakfast at [Restaurant Name](Restaurant URL)\n"
+    "- Afternoon: Visit [Site Name](Site URL)\n"
+    "- Evening: Dinner at [Restaurant Name](Restaurant URL)\n"
+    "## City Name\n"
+    "### June 3, 2022 (Day 3)\n"
+    "- Morning: Breakfast at [Restaurant Name](Restaurant URL)\n"
+    "- Afternoon: Visit [Site Name](Site URL)\n"
+    "- Evening: Dinner at [Restaurant Name](Restaurant URL)\n"
+    "## Additional Information\n"
+    "Include any additional information here."
+)
+
+
+async def create_agent_and_process(agent_pool):
+    """Run a conversation on a pooled agent with the necessary tools."""
+    thread_id, run, timings = await agent_pool.run(
         model=AZ_MODEL_DEPLOYMENT_NAME,
-        name="travel-recommender",
-        instructions=(
-            "You are an AI travel assistant. Analyze provided travel itineraries "
-            "and generate engaging, personalized recommendations for destinations, "
-            "activities, dining experiences, and efficient transportation methods. "
-            "Only save the itinerary as a PDF when the user explicitly requests it and says where they want it saved."
-            "When asked to create travel plans based on existing itinerary, "
-            "Create a new, concise travel itinerary with daily schedules for the entire travel duration, "
-            "beginning on the the start date and ending on the end date. "
-            "Provide recommendations for morning, afternoon, and evening activities, including dining options for"
-            "every day of the trip. "
-            "Keep existing plans and add new activities located in areas I'll be in each day."
-            "If I am not in a new city/area, assume I am at the same location as the prior day. "
-            "Search with Bing for popular sites, restaurants, and activities. "
-            "Always include citations for information provided."
-            "Use the following markdown format for the itinerary in your response: "
-            "# Travel Itinerary\n"
-            "## Travel Dates\n"
-            "Start Date: {{start_date}}\n"
-            "End Date: {{end_date}}\n"
-            "## City Name\n"
-            "### June 1, 2022 (Day 1)\n"
-            "- Morning: Breakfast at [Restaurant Name](Restaurant URL)\n"
-            "- Afternoon: Visit [Site Name](Site URL)\n"
-            "- Evening: Dinner at [Restaurant Name](Restaurant URL)\n"
-            "### June 2, 2022 (Day 2)\n"
-            "- Morning: Breakfast at [Restaurant Name](Restaurant URL)\n"
-            "- Afternoon: Visit [Site Name](Site URL)\n"
-            "- Evening: Dinner at [Restaurant Name](Restaurant URL)\n"
-            "## City Name\n"
-            "### June 3, 2022 (Day 3)\n"
-            "- Morning: Breakfast at [Restaurant Name](Restaurant URL)\n"
-            "- Afternoon: Visit [Site Name](Site URL)\n"
-            "- Evening: Dinner at [Restaurant Name](Restaurant URL)\n"
-            "## Additional Information\n"
-            "Include any additional information here."
-        ),
-        toolset=toolset,
-        headers={"x-ms-enable-preview": "true"},
-    )
-    logging.info("Created agent, ID: %s", agent.id)
-
-    # Create thread and message
-    thread = await project_client.agents.create_thread()
-    logging.info("Created thread, ID: %s", thread.id)
-
-    message = await project_client.agents.create_message(
-        thread_id=thread.id,
+        instructions=AGENT_INSTRUCTIONS,
+        functions=travel_functions,
+        bing_connection_name=os.environ.get("BING_CONNECTION_NAME"),
         role=MessageRole.USER,
         content=(
             f"Suggest additional activities based on my existing itinerary at {ITINERARY_FILE}."
@@ -103,19 +94,14 @@ async def create_agent_and_process(project_client):
             f"Please save the new itinerary to {SAVE_TO_PDF_FILE}."
         ),
     )
-    logging.info("Created message, ID: %s", message.id)
-
-    # Run the conversation
-    run = await project_client.agents.create_and_process_run(
-        thread_id=thread.id,
-        agent_id=agent.id
-    )
+    logging.info("Processed thread, ID: %s", thread_id)
+    logging.info("⏱️ Request latency: %s", timings.as_dict())
 
     if run.status != "completed":
         logging.error(
             "Run failed with status: %s, error: %s", run.status, run.last_error)
 
-    return thread.id, agent.id
+    return thread_id
 
 
 async def main():
@@ -123,25 +109,34 @@ async def main():
     Main function to create and manage an Azure Content Understanding analyzer and an AI Agent.
 
     This function performs the following steps:
-    1. Generates a unique analyzer ID and sets the analyzer template path.
+    1. Sets the analyzer template path and the analysis result cache.
     2. Creates Azure credentials and a token provider.
     3. Initializes the Azure Content Understanding client.
-    4. Creates an analyzer using the specified template.
-    5. Checks the status of the analyzer creation and logs the result.
-    6. Initializes the AI project client using a connection string.
-    7. Creates an agent and processes it, retrieves messages from the agent, and logs the agent's response.
-    8. Cleans up by deleting the thread and agent, and closing the project client.
-    9. Deletes the analyzer and closes the Azure credentials.
+    4. Reuses the analyzer built from the same template, creating it only if none exists.
+    5. Initializes the AI project client using a connection string.
+    6. Runs the conversation on a pooled agent, retrieves messages from the agent, and logs the agent's response.
+    7. Cleans up by deleting the thread and the pooled agents, and closing the project client.
+    8. Waits for stale analyzer cleanup and closes the Azure credentials.
 
     Logging is used extensively to provide information about the progress and status of each step.
 
     Raises:
         SystemExit: If the analyzer creation fails.
     """
-    config.ANALYZER_ID = "itinerary_analyzer-" + str(uuid.uuid4().hex[:8])
     ANALYZER_TEMPLATE_PATH = Path(os.path.dirname(
         __file__)) / "analyzer_templates" / "itinerary_template.json"
 
+    config.ANALYZER_TEMPLATE_HASH = hash_template(
+        analyzer_template_path=ANALYZER_TEMPLATE_PATH)
+    config.RESULT_CACHE = AnalysisResultCache(
+        cache_dir=ANALYSIS_CACHE_DIR,
+        ttl_seconds=ANALYSIS_CACHE_TTL_SECONDS,
+        max_bytes=ANALYSIS_CACHE_MAX_BYTES,
+    )
+
+    # Markdown -> PDF rendering runs in worker processes so it does not block the agent loop
+    config.PDF_RENDERER = PdfRenderService()
+
     # Create our credentials - these need to be properly closed
     credential = DefaultAzureCredential()
 
@@ -156,19 +151,19 @@ async def main():
             endpoint=AZURE_AI_ENDPOINT,
             api_version=AZURE_AI_API_VERSION,
             token_provider=token_provider,
+            blob_store=LocalBlobStore(BLOB_STORE_DIR, BLOB_STORE_BASE_URL)
+            if BLOB_STORE_DIR and BLOB_STORE_BASE_URL else None,
         )
 
-        analyzer = config.CU_CLIENT.begin_create_analyzer(
-            analyzer_id=config.ANALYZER_ID, analyzer_template_path=ANALYZER_TEMPLATE_PATH)
-        result = config.CU_CLIENT.poll_result(analyzer)
-
-        if result and "status" in result and result["status"] == "Succeeded":
-            logging.info("✅ Analyzer '%s' created successfully!",
-                         result['result']['analyzerId'])
-            logging.info(json.dumps(result, indent=2))
-        else:
-            logging.error("❌ Failed to create the analyzer.")
-            logging.error(json.dumps(result, indent=2))
+        # Analyzers are reused across runs; one is created only when the template changes
+        analyzer_registry = AnalyzerRegistry(config.CU_CLIENT)
+        try:
+            config.ANALYZER_ID = await analyzer_registry.get_or_create_async(
+                ANALYZER_TEMPLATE_PATH)
+        except Exception as e:
+            logging.error("❌ Failed to create the analyzer: %s", e)
+            await analyzer_registry.aclose()
+            await config.CU_CLIENT.aclose()
             sys.exit(1)
 
         # Create the project client
@@ -176,8 +171,11 @@ async def main():
             credential=credential, conn_str=AZ_FOUNDRY_PROJECT_CONNECTION_STRINGS
         )
 
+        # Agents are reused across requests with the same model, instructions and tools
+        agent_pool = AgentPool(project_client)
+
         try:
-            thread_id, agent_id = await create_agent_and_process(project_client)
+            thread_id = await create_agent_and_process(agent_pool)
 
             # Get messages from the thread
             messages = await project_client.agents.list_messages(thread_id=thread_id)
@@ -193,19 +191,21 @@ async def main():
             # Cleanup
             await project_client.agents.delete_thread(thread_id)
             logging.info("Thread deleted.")
-            await project_client.agents.delete_agent(agent_id)
-            logging.info("Agent deleted.")
         finally:
+            await agent_pool.close()
             # Ensure project_client gets closed
             await project_client.close()
             logging.info("Project client closed.")
 
-        config.CU_CLIENT.delete_analyzer(analyzer_id=config.ANALYZER_ID)
-        logging.info("Analyzer deleted.")
+        await analyzer_registry.aclose()
+        await config.CU_CLIENT.aclose()
+        logging.info("Content Understanding client closed.")
     finally:
         # Properly close the credential
         await credential.close()
         logging.info("DefaultAzureCredential closed.")
+        config.PDF_RENDERER.shutdown()
+        logging.info("PDF render service stopped.")
 
     logging.info("✅ All processes completed successfully.")
 
@@ -1,2 +1,54 @@
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from typing import Any, Optional
+
+# Process-wide defaults, set by app.py for the one-shot script
 CU_CLIENT = None
 ANALYZER_ID = None
+BATCH_MAX_CONCURRENCY = 4
+RESULT_CACHE = None
+ANALYZER_TEMPLATE_HASH = None
+PDF_RENDERER = None
+
+
+@dataclass(frozen=True)
+class ItineraryContext:
+    """The state a tool call needs. Each service request runs with its own copy."""
+    cu_client: Any = None
+    analyzer_id: Optional[str] = None
+    result_cache: Any = None
+    analyzer_template_hash: Optional[str] = None
+    pdf_renderer: Any = None
+    batch_max_concurrency: int = 4
+    request_id: Optional[str] = None
+
+    def for_request(self, request_id: str) -> "ItineraryContext":
+        return replace(self, request_id=request_id)
+
+
+_request_context: ContextVar[Optional[ItineraryContext]] = ContextVar(
+    "itinerary_context", default=None)
+
+
+def current() -> ItineraryContext:
+    """Returns the context of the request running in this task, or one built from the module defaults."""
+    context = _request_context.get()
+    if context is not None:
+        return context
+    return ItineraryContext(
+        cu_client=CU_CLIENT,
+        analyzer_id=ANALYZER_ID,
+        result_cache=RESULT_CACHE,
+        analyzer_template_hash=ANALYZER_TEMPLATE_HASH,
+        pdf_renderer=PDF_RENDERER,
+        batch_max_concurrency=BATCH_MAX_CONCURRENCY,
+    )
+
+
+def use(context: ItineraryContext):
+    """Makes `context` current for this task and the tool calls it awaits. Returns a token for `reset`."""
+    return _request_context.set(context)
+
+
+def reset(token):
+    _request_context.reset(token)
@@ -0,0 +1,164 @@
+import json
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    import ijson
+except ImportError:  # Fall back to a full json.loads when ijson is not installed
+    ijson = None
+
+
+class AnalyzeResult:
+    """
+    A lazily parsed view over the raw bytes of a Content Understanding analyze result.
+
+    Only the parts that are asked for are decoded. With `ijson` installed the bytes are
+    walked as a stream of events, subtrees other than the requested fields are skipped, and
+    parsing stops as soon as the requested content has been read, so a large multi-page
+    result costs little more than a small one. Without `ijson` the whole payload is decoded
+    once with `json.loads` and reused.
+    """
+
+    def __init__(self, raw: bytes):
+        self._raw = raw
+        self._parsed: Optional[dict] = None
+        self._status: Optional[str] = None
+
+    @classmethod
+    def from_response(cls, response) -> "AnalyzeResult":
+        return cls(response.content)
+
+    @property
+    def raw(self) -> bytes:
+        return self._raw
+
+    @property
+    def size(self) -> int:
+        return len(self._raw)
+
+    @property
+    def status(self) -> str:
+        """The operation status, e.g. "Succeeded", read without decoding the rest of the payload."""
+        if self._status is None:
+            self._status = self._read(content_index=0, field_names=(),
+                                      want_markdown=False)["status"] or ""
+        return self._status
+
+    def to_dict(self) -> dict:
+        """Decodes the whole payload. Avoid on the hot path for large results."""
+        if self._parsed is None:
+            self._parsed = json.loads(self._raw)
+        return self._parsed
+
+    def get_markdown(self, content_index: int = 0) -> Optional[str]:
+        return self._read(content_index, field_names=(), want_markdown=True)["markdown"]
+
+    def get_fields(self, field_names: Iterable[str], content_index: int = 0) -> Dict[str, dict]:
+        """
+        Returns the raw field objects (with `type` and `value*` keys) for the requested names.
+
+        Args:
+            field_names (Iterable[str]): The names of the fields in the analyzer's field schema.
+            content_index (int, optional): The index of the content in `result.contents`. Defaults to 0.
+
+        Returns:
+            Dict[str, dict]: The field objects that are present, keyed by field name.
+        """
+        return self._read(content_index, tuple(field_names), want_markdown=False)["fields"]
+
+    def get_field_values(
+        self, field_names: Iterable[str], content_index: int = 0, include_markdown: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Returns the typed values of the requested fields, plus the content markdown if asked for.
+
+        A missing field maps to None. The value is read from the `value<Type>` key that matches
+        the field's `type` (e.g. `valueDate` for a date field).
+        """
+        field_names = tuple(field_names)
+        parsed = self._read(content_index, field_names, want_markdown=include_markdown)
+        values = {name: self.field_value(parsed["fields"].get(name))
+                  for name in field_names}
+        if include_markdown:
+            values["markdown"] = parsed["markdown"]
+        return values
+
+    @staticmethod
+    def field_value(field: Optional[dict]) -> Any:
+        if not field:
+            return None
+        field_type = field.get("type", "")
+        if field_type:
+            key = "value" + field_type[0].upper() + field_type[1:]
+            if key in field:
+                return field[key]
+        return next((value for key, value in field.items() if key.startswith("value")), None)
+
+    def _read(self, content_index: int, field_names: tuple, want_markdown: bool) -> dict:
+        if ijson is None or self._parsed is not None:
+            return self._read_parsed(content_index, field_names, want_markdown)
+        return self._read_stream(content_index, field_names, want_markdown)
+
+    def _read_parsed(self, content_index: int, field_names: tuple, want_markdown: bool) -> dict:
+        parsed = self.to_dict()
+        contents = parsed.get("result", {}).get("contents", [])
+        content = contents[content_index] if content_index < len(
+            contents) else {}
+        fields = content.get("fields", {})
+        return {
+            "status": parsed.get("status"),
+            "markdown": content.get("markdown") if want_markdown else None,
+            "fields": {name: fields[name] for name in field_names if name in fields},
+        }
+
+    def _read_stream(self, content_index: int, field_names: tuple, want_markdown: bool) -> dict:
+        found = {"status": None, "markdown": None, "fields": {}}
+        wanted_fields = {f"result.contents.item.fields.{name}": name
+                         for name in field_names}
+        current_index = -1
+        builder = None
+        builder_prefix = None
+        builder_name = None
+        content_read = False
+
+        def is_complete():
+            # Everything requested has been read, so the remaining pages/words can be skipped.
+            return (found["status"] is not None
+                    and len(found["fields"]) == len(wanted_fields)
+                    and (found["markdown"] is not None or not want_markdown))
+
+        for prefix, event, value in ijson.parse(self._raw, use_float=True):
+            if builder is not None:
+                if prefix == builder_prefix and event == "end_map":
+                    found["fields"][builder_name] = builder.value
+                    builder = None
+                    if is_complete():
+                        break
+                else:
+                    builder.event(event, value)
+                continue
+
+            if prefix == "status" and event == "string":
+                found["status"] = value
+                if content_read or is_complete():
+                    break
+            elif prefix == "result.contents.item" and event == "start_map":
+                current_index += 1
+            elif prefix == "result.contents.item" and event == "end_map":
+                # Nothing more to read from this content, but `status` may still follow `result`
+                if current_index == content_index:
+                    content_read = True
+                    if found["status"] is not None:
+                        break
+            elif current_index != content_index:
+                continue
+            elif want_markdown and prefix == "result.contents.item.markdown" and event == "string":
+                found["markdown"] = value
+                if is_complete():
+                    break
+            elif event == "start_map" and prefix in wanted_fields:
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+                builder_prefix = prefix
+                builder_name = wanted_fields[prefix]
+
+        return found
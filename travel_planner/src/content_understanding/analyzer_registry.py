@@ -0,0 +1,168 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Set
+
+import httpx
+
+from content_understanding.result_cache import hash_template
+
+
+class AnalyzerRegistry:
+    """
+    Reuses Content Understanding analyzers across runs instead of creating one per run.
+
+    Each analyzer is tagged with the fingerprint of the template it was built from and gets a
+    deterministic ID (`<prefix>-<fingerprint>`). A run looks the fingerprint up with
+    `get_all_analyzers` and only creates an analyzer on a miss. When a miss means the template
+    changed, the analyzers it replaces (same prefix, tagged with a different fingerprint) are
+    deleted in the background once they have not been modified for `stale_after_seconds`.
+    Nothing is deleted on a hit, so a deployment that reuses its analyzer never removes
+    another deployment's, and untagged analyzers are never touched.
+    """
+
+    FINGERPRINT_TAG = "templateFingerprint"
+
+    def __init__(
+        self,
+        cu_client,
+        analyzer_prefix: str = "itinerary_analyzer",
+        stale_after_seconds: int = 24 * 60 * 60,
+        ready_timeout_seconds: int = 120,
+    ):
+        self._cu_client = cu_client
+        self._analyzer_prefix = analyzer_prefix
+        self._stale_after_seconds = stale_after_seconds
+        self._ready_timeout_seconds = ready_timeout_seconds
+        self._gc_tasks: Set[asyncio.Task] = set()
+        self._logger = logging.getLogger(__name__)
+
+    def _get_analyzer_id(self, fingerprint: str) -> str:
+        return f"{self._analyzer_prefix}-{fingerprint[:16]}"
+
+    async def get_or_create_async(self, analyzer_template_path: str) -> str:
+        """
+        Returns the ID of a ready analyzer built from the template, creating it only if needed.
+
+        Args:
+            analyzer_template_path (str): The file path to the analyzer schema JSON file.
+
+        Raises:
+            RuntimeError: If the analyzer could not be created.
+
+        Returns:
+            str: The analyzer ID.
+        """
+        fingerprint = hash_template(
+            analyzer_template_path=analyzer_template_path)
+        analyzer_id = self._get_analyzer_id(fingerprint)
+
+        analyzers = (await self._cu_client.get_all_analyzers_async()).get("value", [])
+        match = next(
+            (analyzer for analyzer in analyzers
+             if analyzer.get("analyzerId") == analyzer_id
+             or (analyzer.get("tags") or {}).get(self.FINGERPRINT_TAG) == fingerprint),
+            None,
+        )
+
+        if match and match.get("status", "").lower() == "failed":
+            self._logger.warning(
+                f"Analyzer {match['analyzerId']} is in a failed state; recreating it.")
+            await self._cu_client.delete_analyzer_async(match["analyzerId"])
+            match = None
+
+        if match:
+            analyzer_id = match["analyzerId"]
+            self._logger.info(
+                f"Reusing analyzer {analyzer_id} for template fingerprint {fingerprint[:16]}.")
+            if match.get("status", "").lower() != "ready":
+                await self._wait_until_ready(analyzer_id)
+        else:
+            await self._create(analyzer_id, analyzer_template_path, fingerprint)
+            # The template changed, so older versions of this analyzer are now replaced
+            # Finished tasks remove themselves, so a non-empty set means a collection is running
+            if not self._gc_tasks:
+                task = asyncio.create_task(
+                    self._collect_garbage(analyzers, fingerprint))
+                self._gc_tasks.add(task)
+                task.add_done_callback(self._gc_tasks.discard)
+        return analyzer_id
+
+    async def _create(self, analyzer_id: str, analyzer_template_path: str, fingerprint: str):
+        self._logger.info(
+            f"No analyzer for template fingerprint {fingerprint[:16]}; creating {analyzer_id}.")
+        with open(analyzer_template_path, "r") as file:
+            analyzer_template = json.load(file)
+        analyzer_template["tags"] = {
+            **analyzer_template.get("tags", {}), self.FINGERPRINT_TAG: fingerprint}
+
+        try:
+            response = await self._cu_client.begin_create_analyzer_async(
+                analyzer_id=analyzer_id, analyzer_template=analyzer_template)
+        except httpx.HTTPStatusError as e:
+            # Another process created the same analyzer between our lookup and this request.
+            if e.response.status_code != 409:
+                raise
+            await self._wait_until_ready(analyzer_id)
+            return
+
+        result = await self._cu_client.poll_result_async(
+            response, timeout_seconds=self._ready_timeout_seconds)
+        if not result or result.get("status", "").lower() != "succeeded":
+            raise RuntimeError(f"Failed to create analyzer {analyzer_id}.")
+        self._logger.info(f"✅ Analyzer '{analyzer_id}' created successfully!")
+
+    async def _wait_until_ready(self, analyzer_id: str):
+        interval = 0.5
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._ready_timeout_seconds
+        while True:
+            detail = await self._cu_client.get_analyzer_detail_by_id_async(analyzer_id)
+            status = detail.get("status", "").lower()
+            if status == "ready":
+                return
+            if status == "failed":
+                raise RuntimeError(f"Analyzer {analyzer_id} failed to build.")
+            if loop.time() > deadline:
+                raise TimeoutError(
+                    f"Analyzer {analyzer_id} not ready after {self._ready_timeout_seconds} seconds.")
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, 5)
+
+    def _is_stale(self, analyzer: dict) -> bool:
+        modified_at = analyzer.get("lastModifiedAt") or analyzer.get("createdAt")
+        if not modified_at:
+            return False
+        try:
+            modified = datetime.fromisoformat(modified_at.replace("Z", "+00:00"))
+        except ValueError:
+            return False
+        if modified.tzinfo is None:
+            modified = modified.replace(tzinfo=timezone.utc)
+        age = (datetime.now(timezone.utc) - modified).total_seconds()
+        return age > self._stale_after_seconds
+
+    async def _collect_garbage(self, analyzers: list, fingerprint: str):
+        for analyzer in analyzers:
+            analyzer_id = analyzer.get("analyzerId", "")
+            if not analyzer_id.startswith(f"{self._analyzer_prefix}-"):
+                continue
+            # Only analyzers a registry built from another version of the template are replaced
+            analyzer_fingerprint = (analyzer.get("tags") or {}).get(self.FINGERPRINT_TAG)
+            if not analyzer_fingerprint or analyzer_fingerprint == fingerprint \
+                    or analyzer_id == self._get_analyzer_id(fingerprint):
+                continue
+            if not self._is_stale(analyzer):
+                continue
+            try:
+                await self._cu_client.delete_analyzer_async(analyzer_id)
+            except httpx.HTTPError as e:
+                self._logger.warning(
+                    f"Failed to delete stale analyzer {analyzer_id}: {e}")
+
+    async def aclose(self):
+        """Waits for any background garbage collection to finish."""
+        if self._gc_tasks:
+            await asyncio.gather(*self._gc_tasks)
+            self._gc_tasks.clear()
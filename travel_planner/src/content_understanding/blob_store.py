@@ -0,0 +1,50 @@
+import asyncio
+import logging
+import shutil
+import uuid
+from pathlib import Path
+from urllib.parse import quote
+
+
+class LocalBlobStore:
+    """
+    A stand-in for Azure Blob Storage that copies files into a local directory and returns
+    the URL they are served from.
+
+    Point `base_url` at whatever serves `root_dir` over HTTP(S) and is reachable by the
+    Content Understanding service (e.g. a storage container mounted with blobfuse, or a
+    tunneled static file server during development). Any object with the same `upload` and
+    `upload_async` methods can be passed to `AzureContentUnderstandingClient` instead.
+    """
+
+    def __init__(self, root_dir: str, base_url: str, chunk_size: int = 1024 * 1024):
+        if not base_url:
+            raise ValueError("Base URL must be provided.")
+
+        self._root_dir = Path(root_dir)
+        self._root_dir.mkdir(parents=True, exist_ok=True)
+        self._base_url = base_url.rstrip("/")
+        self._chunk_size = chunk_size
+        self._logger = logging.getLogger(__name__)
+
+    def upload(self, path: Path) -> str:
+        """
+        Copies the file into the store in fixed-size chunks and returns its URL.
+
+        Args:
+            path (Path): The local file to upload.
+
+        Returns:
+            str: The URL the uploaded file can be retrieved from.
+        """
+        path = Path(path)
+        blob_name = f"{uuid.uuid4().hex}-{path.name}"
+        with open(path, "rb") as source, open(self._root_dir / blob_name, "wb") as target:
+            shutil.copyfileobj(source, target, self._chunk_size)
+
+        self._logger.info(f"Uploaded {path} to blob store as {blob_name}.")
+        return f"{self._base_url}/{quote(blob_name)}"
+
+    async def upload_async(self, path: Path) -> str:
+        """Async version of `upload` that copies the file off the event loop."""
+        return await asyncio.to_thread(self.upload, path)
@@ -1,9 +1,45 @@
+import asyncio
+import email.utils
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 from requests.models import Response
 import logging
 import json
+import mimetypes
+import os
+import re
 import time
+from collections import deque
+from dataclasses import dataclass
 from pathlib import Path
+from typing import AsyncIterator, Iterable, List, Optional, Union
+
+from content_understanding.analyze_result import AnalyzeResult
+
+
+@dataclass
+class BatchAnalyzeResult:
+    """The outcome of one document in `AzureContentUnderstandingClient.analyze_batch_async`."""
+    file_location: str
+    result: Optional[Union[dict, AnalyzeResult]] = None
+    error: Optional[Exception] = None
+    submit_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class _BatchOperation:
+    file_location: str
+    started_at: float
+    operation_location: str = ""
+    submit_seconds: float = 0.0
+    next_poll_at: float = 0.0
+    interval: float = 0.0
 
 
 class AzureContentUnderstandingClient:
@@ -14,6 +50,11 @@ class AzureContentUnderstandingClient:
         subscription_key: str = None,
         token: str = None,
         x_ms_useragent: str = "cu-sample-code",
+        pool_maxsize: int = 10,
+        timeout_seconds: float = 60,
+        blob_store=None,
+        upload_threshold_bytes: int = 20 * 1024 * 1024,
+        upload_chunk_size: int = 1024 * 1024,
     ):
         if not subscription_key and not token:
             raise ValueError(
@@ -30,6 +71,25 @@ class AzureContentUnderstandingClient:
         self._headers = self._get_headers(
             subscription_key, token, x_ms_useragent
         )
+        self._pool_maxsize = pool_maxsize
+        self._timeout_seconds = timeout_seconds
+
+        # Local files larger than upload_threshold_bytes are uploaded to the blob store and
+        # analyzed by URL; smaller ones are streamed in upload_chunk_size pieces.
+        self._blob_store = blob_store
+        self._upload_threshold_bytes = upload_threshold_bytes
+        self._upload_chunk_size = upload_chunk_size
+
+        # One pooled session for every sync call so that repeated requests
+        # (e.g. each iteration of poll_result) reuse the same TCP+TLS connection.
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        # The async client is created lazily so it binds to the running event loop.
+        self._async_client = None
 
     @classmethod
     async def create(
@@ -39,6 +99,11 @@ class AzureContentUnderstandingClient:
         subscription_key: str = None,
         token_provider: callable = None,
         x_ms_useragent: str = "cu-sample-code",
+        pool_maxsize: int = 10,
+        timeout_seconds: float = 60,
+        blob_store=None,
+        upload_threshold_bytes: int = 20 * 1024 * 1024,
+        upload_chunk_size: int = 1024 * 1024,
     ):
         if token_provider:
             token = await token_provider()
@@ -51,8 +116,48 @@ class AzureContentUnderstandingClient:
             subscription_key=subscription_key,
             token=token,
             x_ms_useragent=x_ms_useragent,
+            pool_maxsize=pool_maxsize,
+            timeout_seconds=timeout_seconds,
+            blob_store=blob_store,
+            upload_threshold_bytes=upload_threshold_bytes,
+            upload_chunk_size=upload_chunk_size,
         )
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def close(self):
+        """Closes the pooled sync session."""
+        self._session.close()
+
+    async def aclose(self):
+        """Closes both the pooled async client and the sync session."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        self.close()
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Returns the shared httpx.AsyncClient, creating it on first use."""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self._pool_maxsize,
+                    max_keepalive_connections=self._pool_maxsize,
+                ),
+                timeout=self._timeout_seconds,
+            )
+        return self._async_client
+
     def _get_headers(self, subscription_key, token, x_ms_useragent):
         """Returns the headers for the HTTP requests."""
         headers = (
@@ -81,6 +186,60 @@ class AzureContentUnderstandingClient:
             "prefix": storage_container_path_prefix,
         }
 
+    def _load_analyzer_template(
+        self,
+        analyzer_template: dict,
+        analyzer_template_path: str,
+        training_storage_container_sas_url: str,
+        training_storage_container_path_prefix: str,
+    ) -> dict:
+        """Resolves the analyzer template from a dict or JSON file and attaches training data."""
+        if analyzer_template_path and Path(analyzer_template_path).exists():
+            with open(analyzer_template_path, "r") as file:
+                analyzer_template = json.load(file)
+
+        if not analyzer_template:
+            raise ValueError("Analyzer schema must be provided.")
+
+        if (
+            training_storage_container_sas_url
+            and training_storage_container_path_prefix
+        ):  # noqa
+            analyzer_template["trainingData"] = self._get_training_data_config(
+                training_storage_container_sas_url,
+                training_storage_container_path_prefix,
+            )
+        return analyzer_template
+
+    def _resolve_analyze_source(self, file_location: str):
+        """Returns ("file", Path) for local files and ("url", str) for URLs."""
+        if Path(file_location).exists():
+            return "file", Path(file_location)
+        elif "https://" in file_location or "http://" in file_location:
+            return "url", file_location
+        raise ValueError("File location must be a valid path or URL.")
+
+    def _should_upload(self, path: Path) -> bool:
+        """Whether a local file is large enough to be submitted by URL through the blob store."""
+        return (
+            self._blob_store is not None
+            and path.stat().st_size > self._upload_threshold_bytes
+        )
+
+    def _get_analyze_headers(self, content_type: str) -> dict:
+        headers = {"Content-Type": content_type}
+        headers.update(self._headers)
+        return headers
+
+    async def _iter_file_chunks_async(self, path: Path):
+        """Yields the file in fixed-size chunks, reading off the event loop."""
+        with open(path, "rb") as file:
+            while True:
+                chunk = await asyncio.to_thread(file.read, self._upload_chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
     def get_all_analyzers(self):
         """
         Retrieves a list of all available analyzers from the content understanding service.
@@ -95,13 +254,22 @@ class AzureContentUnderstandingClient:
         Raises:
             requests.exceptions.HTTPError: If the HTTP request returned an unsuccessful status code.
         """
-        response = requests.get(
+        response = self._session.get(
             url=self._get_analyzer_list_url(self._endpoint, self._api_version),
             headers=self._headers,
         )
         response.raise_for_status()
         return response.json()
 
+    async def get_all_analyzers_async(self):
+        """Async version of `get_all_analyzers` using the pooled httpx client."""
+        response = await self._get_async_client().get(
+            self._get_analyzer_list_url(self._endpoint, self._api_version),
+            headers=self._headers,
+        )
+        response.raise_for_status()
+        return response.json()
+
     def get_analyzer_detail_by_id(self, analyzer_id):
         """
         Retrieves a specific analyzer detail through analyzerid from the content understanding service.
@@ -116,7 +284,7 @@ class AzureContentUnderstandingClient:
         Raises:
             HTTPError: If the request fails.
         """
-        response = requests.get(
+        response = self._session.get(
             url=self._get_analyzer_url(
                 self._endpoint, self._api_version, analyzer_id),
             headers=self._headers,
@@ -124,6 +292,16 @@ class AzureContentUnderstandingClient:
         response.raise_for_status()
         return response.json()
 
+    async def get_analyzer_detail_by_id_async(self, analyzer_id):
+        """Async version of `get_analyzer_detail_by_id` using the pooled httpx client."""
+        response = await self._get_async_client().get(
+            self._get_analyzer_url(
+                self._endpoint, self._api_version, analyzer_id),
+            headers=self._headers,
+        )
+        response.raise_for_status()
+        return response.json()
+
     def begin_create_analyzer(
         self,
         analyzer_id: str,
@@ -149,26 +327,17 @@ class AzureContentUnderstandingClient:
         Returns:
             requests.Response: The response object from the HTTP request.
         """
-        if analyzer_template_path and Path(analyzer_template_path).exists():
-            with open(analyzer_template_path, "r") as file:
-                analyzer_template = json.load(file)
-
-        if not analyzer_template:
-            raise ValueError("Analyzer schema must be provided.")
-
-        if (
-            training_storage_container_sas_url
-            and training_storage_container_path_prefix
-        ):  # noqa
-            analyzer_template["trainingData"] = self._get_training_data_config(
-                training_storage_container_sas_url,
-                training_storage_container_path_prefix,
-            )
+        analyzer_template = self._load_analyzer_template(
+            analyzer_template,
+            analyzer_template_path,
+            training_storage_container_sas_url,
+            training_storage_container_path_prefix,
+        )
 
         headers = {"Content-Type": "application/json"}
         headers.update(self._headers)
 
-        response = requests.put(
+        response = self._session.put(
             url=self._get_analyzer_url(
                 self._endpoint, self._api_version, analyzer_id),
             headers=headers,
@@ -180,6 +349,44 @@ class AzureContentUnderstandingClient:
         self._logger.info(f"Analyzer {analyzer_id} create request accepted.")
         return response
 
+    async def begin_create_analyzer_async(
+        self,
+        analyzer_id: str,
+        analyzer_template: dict = None,
+        analyzer_template_path: str = "",
+        training_storage_container_sas_url: str = "",
+        training_storage_container_path_prefix: str = "",
+    ):
+        """
+        Async version of `begin_create_analyzer` using the pooled httpx client.
+
+        Returns:
+            httpx.Response: The response object from the HTTP request.
+        """
+        analyzer_template = self._load_analyzer_template(
+            analyzer_template,
+            analyzer_template_path,
+            training_storage_container_sas_url,
+            training_storage_container_path_prefix,
+        )
+
+        headers = {"Content-Type": "application/json"}
+        headers.update(self._headers)
+
+        response = await self._get_async_client().put(
+            self._get_analyzer_url(
+                self._endpoint, self._api_version, analyzer_id),
+            headers=headers,
+            json=analyzer_template,
+        )
+        if response.is_error:
+            self._logger.error(
+                f"Azure Content Understanding API Error: {response.text}")
+        response.raise_for_status()
+
+        self._logger.info(f"Analyzer {analyzer_id} create request accepted.")
+        return response
+
     def delete_analyzer(self, analyzer_id: str):
         """
         Deletes an analyzer with the specified analyzer ID.
@@ -193,7 +400,7 @@ class AzureContentUnderstandingClient:
         Raises:
             HTTPError: If the delete request fails.
         """
-        response = requests.delete(
+        response = self._session.delete(
             url=self._get_analyzer_url(
                 self._endpoint, self._api_version, analyzer_id),
             headers=self._headers,
@@ -202,10 +409,25 @@ class AzureContentUnderstandingClient:
         self._logger.info(f"Analyzer {analyzer_id} deleted.")
         return response
 
+    async def delete_analyzer_async(self, analyzer_id: str):
+        """Async version of `delete_analyzer` using the pooled httpx client."""
+        response = await self._get_async_client().delete(
+            self._get_analyzer_url(
+                self._endpoint, self._api_version, analyzer_id),
+            headers=self._headers,
+        )
+        response.raise_for_status()
+        self._logger.info(f"Analyzer {analyzer_id} deleted.")
+        return response
+
     def begin_analyze(self, analyzer_id: str, file_location: str):
         """
         Begins the analysis of a file or URL using the specified analyzer.
 
+        Local files are streamed from disk rather than read into memory. When a blob store is
+        configured and the file exceeds `upload_threshold_bytes`, the file is uploaded there and
+        its URL is submitted instead.
+
         Args:
             analyzer_id (str): The ID of the analyzer to use.
             file_location (str): The path to the file or the URL to analyze.
@@ -217,33 +439,63 @@ class AzureContentUnderstandingClient:
             ValueError: If the file location is not a valid path or URL.
             HTTPError: If the HTTP request returned an unsuccessful status code.
         """
-        data = None
-        if Path(file_location).exists():
-            with open(file_location, "rb") as file:
-                data = file.read()
-            headers = {"Content-Type": "application/octet-stream"}
-        elif "https://" in file_location or "http://" in file_location:
-            data = {"url": file_location}
-            headers = {"Content-Type": "application/json"}
+        kind, source = self._resolve_analyze_source(file_location)
+        if kind == "file" and self._should_upload(source):
+            kind, source = "url", self._blob_store.upload(source)
+
+        url = self._get_analyze_url(
+            self._endpoint, self._api_version, analyzer_id)
+        if kind == "url":
+            response = self._session.post(
+                url=url,
+                headers=self._get_analyze_headers("application/json"),
+                json={"url": source},
+            )
         else:
-            raise ValueError("File location must be a valid path or URL.")
+            # Passing the open file lets requests stream it in blocks with a Content-Length
+            # header instead of holding the whole document in memory.
+            with open(source, "rb") as file:
+                response = self._session.post(
+                    url=url,
+                    headers=self._get_analyze_headers(
+                        "application/octet-stream"),
+                    data=file,
+                )
 
-        headers.update(self._headers)
-        if isinstance(data, dict):
-            response = requests.post(
-                url=self._get_analyze_url(
-                    self._endpoint, self._api_version, analyzer_id
-                ),
-                headers=headers,
-                json=data,
+        response.raise_for_status()
+        self._logger.info(
+            f"Analyzing file {file_location} with analyzer: {analyzer_id}"
+        )
+        return response
+
+    async def begin_analyze_async(self, analyzer_id: str, file_location: str):
+        """
+        Async version of `begin_analyze` using the pooled httpx client.
+
+        Returns:
+            httpx.Response: The response from the analysis request. Its `operation-location`
+            header can be passed to `poll_result` like a `requests.Response`.
+        """
+        kind, source = self._resolve_analyze_source(file_location)
+        if kind == "file" and self._should_upload(source):
+            kind, source = "url", await self._blob_store.upload_async(source)
+
+        url = self._get_analyze_url(
+            self._endpoint, self._api_version, analyzer_id)
+        if kind == "url":
+            response = await self._get_async_client().post(
+                url,
+                headers=self._get_analyze_headers("application/json"),
+                json={"url": source},
             )
         else:
-            response = requests.post(
-                url=self._get_analyze_url(
-                    self._endpoint, self._api_version, analyzer_id
-                ),
+            # An explicit Content-Length keeps httpx from falling back to chunked encoding.
+            headers = self._get_analyze_headers("application/octet-stream")
+            headers["Content-Length"] = str(source.stat().st_size)
+            response = await self._get_async_client().post(
+                url,
                 headers=headers,
-                data=data,
+                content=self._iter_file_chunks_async(source),
             )
 
         response.raise_for_status()
@@ -252,6 +504,27 @@ class AzureContentUnderstandingClient:
         )
         return response
 
+    async def get_document_version_async(self, url: str) -> Optional[str]:
+        """
+        Returns the ETag (or Last-Modified) of a document URL, used to detect changed documents.
+
+        The request is sent without the Content Understanding credentials since the document
+        is hosted elsewhere.
+
+        Args:
+            url (str): The URL of the document.
+
+        Returns:
+            Optional[str]: The version identifier, or None if the server does not provide one.
+        """
+        try:
+            response = await self._get_async_client().head(url, follow_redirects=True)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            self._logger.warning(f"Could not get the version of {url}: {e}")
+            return None
+        return response.headers.get("etag") or response.headers.get("last-modified")
+
     def get_image_from_analyze_operation(
         self, analyze_response: Response, image_id: str
     ):
@@ -273,17 +546,161 @@ class AzureContentUnderstandingClient:
             f"{operation_location}/images/{image_id}?api-version={self._api_version}"
         )
         try:
-            response = requests.get(
+            response = self._session.get(
                 url=image_retrieval_url, headers=self._headers)
             response.raise_for_status()
 
-            assert response.headers.get("Content-Type") == "image/jpeg"
+            content_type = response.headers.get("Content-Type", "")
+            if not content_type.startswith("image/"):
+                self._logger.warning(
+                    f"Unexpected content type for image {image_id}: {content_type}")
+                return None
 
             return response.content
         except requests.exceptions.RequestException as e:
-            print(f"HTTP request failed: {e}")
+            self._logger.error(f"HTTP request failed: {e}")
             return None
 
+    async def get_image_from_analyze_operation_async(
+        self, analyze_response, image_id: str
+    ):
+        """Async version of `get_image_from_analyze_operation` using the pooled httpx client."""
+        operation_location = analyze_response.headers.get(
+            "operation-location", "")
+        if not operation_location:
+            raise ValueError(
+                "Operation location not found in the analyzer response header."
+            )
+        operation_location = operation_location.split("?api-version")[0]
+        image_retrieval_url = (
+            f"{operation_location}/images/{image_id}?api-version={self._api_version}"
+        )
+        try:
+            response = await self._get_async_client().get(
+                image_retrieval_url, headers=self._headers)
+            response.raise_for_status()
+
+            content_type = response.headers.get("Content-Type", "")
+            if not content_type.startswith("image/"):
+                self._logger.warning(
+                    f"Unexpected content type for image {image_id}: {content_type}")
+                return None
+
+            return response.content
+        except httpx.HTTPError as e:
+            self._logger.error(f"HTTP request failed: {e}")
+            return None
+
+    @staticmethod
+    def get_image_ids_from_analyze_result(result: dict) -> List[str]:
+        """
+        Collects the IDs of every image referenced by an analyze result.
+
+        Images are found in the `figures` of each content and in markdown image links such as
+        `![](figures/1.1)` or `![](keyFrame.1000.jpg)`.
+
+        Args:
+            result (dict): The JSON response of a completed analyze operation.
+
+        Returns:
+            List[str]: The unique image IDs in the order they appear.
+        """
+        image_ids = []
+        for content in result.get("result", {}).get("contents", []):
+            for figure in content.get("figures", []):
+                if figure.get("id"):
+                    image_ids.append(f"figures/{figure['id']}")
+            for link in re.findall(r"!\[[^\]]*\]\(([^)\s]+)\)", content.get("markdown", "")):
+                image_ids.append(re.sub(r"\.(jpe?g|png)$", "", link))
+        return list(dict.fromkeys(image_ids))
+
+    async def download_images_from_analyze_operation_async(
+        self,
+        analyze_response,
+        image_ids: Iterable[str],
+        output_dir: str,
+        max_concurrency: int = 8,
+        use_cache: bool = True,
+    ) -> List[dict]:
+        """
+        Downloads many images of an analyze operation concurrently over the pooled connection.
+
+        Each image is streamed to `<output_dir>/<operation id>/<image id>.<ext>`. With `use_cache`,
+        images already on disk for the same operation are not downloaded again. A failed image is
+        reported in its manifest entry and does not stop the others.
+
+        Args:
+            analyze_response (Response): The response object from the analyze operation.
+            image_ids (Iterable[str]): The IDs of the images to retrieve, see `get_image_ids_from_analyze_result`.
+            output_dir (str): The directory to write the images to.
+            max_concurrency (int, optional): The maximum number of concurrent downloads. Defaults to 8.
+            use_cache (bool, optional): Whether to reuse images already downloaded. Defaults to True.
+
+        Returns:
+            List[dict]: One manifest entry per image with `image_id`, `path`, `content_type`,
+            `bytes`, `cached` and `error`, in the order of `image_ids`.
+        """
+        operation_location = analyze_response.headers.get(
+            "operation-location", "")
+        if not operation_location:
+            raise ValueError(
+                "Operation location not found in the analyzer response header."
+            )
+        operation_location = operation_location.split("?api-version")[0]
+        operation_id = operation_location.rstrip("/").split("/")[-1]
+        operation_dir = Path(output_dir) / operation_id
+        operation_dir.mkdir(parents=True, exist_ok=True)
+
+        client = self._get_async_client()
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def download(image_id: str) -> dict:
+            entry = {"image_id": image_id, "path": None, "content_type": None,
+                     "bytes": 0, "cached": False, "error": None}
+            file_stem = re.sub(r"[^A-Za-z0-9._-]", "_", image_id)
+
+            if use_cache:
+                # Only `<file_stem><ext>` is this image: `figure1.*` also matches `figure1.2.png`,
+                # and a `.part` file is an unfinished download
+                cached = next((path for path in operation_dir.glob(f"{file_stem}.*")
+                               if path.stem == file_stem and path.suffix != ".part"), None)
+                if cached is not None:
+                    entry.update(path=str(cached), bytes=cached.stat().st_size, cached=True,
+                                 content_type=mimetypes.guess_type(cached.name)[0])
+                    return entry
+
+            image_retrieval_url = (
+                f"{operation_location}/images/{image_id}?api-version={self._api_version}"
+            )
+            part_path = operation_dir / f"{file_stem}.part"
+            async with semaphore:
+                try:
+                    async with client.stream("GET", image_retrieval_url, headers=self._headers) as response:
+                        response.raise_for_status()
+                        content_type = response.headers.get("Content-Type", "")
+                        if not content_type.startswith("image/"):
+                            raise ValueError(
+                                f"Unexpected content type {content_type!r}")
+                        with open(part_path, "wb") as file:
+                            async for chunk in response.aiter_bytes():
+                                file.write(chunk)
+                                entry["bytes"] += len(chunk)
+                except (httpx.HTTPError, ValueError, OSError) as e:
+                    self._logger.error(
+                        f"Failed to download image {image_id}: {e}")
+                    part_path.unlink(missing_ok=True)
+                    entry["error"] = str(e)
+                    return entry
+
+            extension = mimetypes.guess_extension(
+                content_type.split(";")[0].strip()) or ".img"
+            image_path = operation_dir / f"{file_stem}{extension}"
+            os.replace(part_path, image_path)
+            entry.update(path=str(image_path), content_type=content_type)
+            return entry
+
+        return list(await asyncio.gather(*(download(image_id) for image_id in image_ids)))
+
     def poll_result(
         self,
         response: Response,
@@ -322,7 +739,7 @@ class AzureContentUnderstandingClient:
                     f"Operation timed out after {timeout_seconds:.2f} seconds."
                 )
 
-            response = requests.get(operation_location, headers=self._headers)
+            response = self._session.get(operation_location, headers=self._headers)
             response.raise_for_status()
             status = response.json().get("status").lower()
             if status == "succeeded":
@@ -339,3 +756,237 @@ class AzureContentUnderstandingClient:
                     f"Request {operation_location.split('/')[-1].split('?')[0]} in progress ..."
                 )
             time.sleep(polling_interval_seconds)
+
+    def _get_retry_after_seconds(self, response):
+        """Parses the Retry-After header (delta-seconds or HTTP-date) into seconds, or None if absent."""
+        retry_after = response.headers.get("retry-after")
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            retry_at = email.utils.parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+
+    async def poll_result_async(
+        self,
+        response,
+        timeout_seconds: int = 120,
+        polling_interval_seconds: float = 1,
+        max_polling_interval_seconds: float = 10,
+        backoff_factor: float = 1.5,
+        cancel_event: asyncio.Event = None,
+        as_analyze_result: bool = False,
+    ):
+        """
+        Polls the result of an asynchronous operation without blocking the event loop.
+
+        The wait between polls starts at `polling_interval_seconds` and grows by `backoff_factor`
+        up to `max_polling_interval_seconds`. A Retry-After header from the service takes
+        precedence over the computed interval, and 429/503 responses are retried instead of raised.
+
+        Args:
+            response (Response): The initial response object containing the operation location.
+            timeout_seconds (int, optional): The maximum number of seconds to wait for the operation to complete. Defaults to 120.
+            polling_interval_seconds (float, optional): The initial number of seconds to wait between polling attempts. Defaults to 1.
+            max_polling_interval_seconds (float, optional): The upper bound for the wait between polling attempts. Defaults to 10.
+            backoff_factor (float, optional): The multiplier applied to the wait after each attempt. Defaults to 1.5.
+            cancel_event (asyncio.Event, optional): When set, polling stops and `asyncio.CancelledError` is raised.
+            as_analyze_result (bool, optional): Return a lazily parsed `AnalyzeResult` over the raw bytes instead of a dict. Defaults to False.
+
+        Raises:
+            ValueError: If the operation location is not found in the response headers.
+            TimeoutError: If the operation does not complete within the specified timeout.
+            RuntimeError: If the operation fails.
+            asyncio.CancelledError: If the task is cancelled or `cancel_event` is set.
+
+        Returns:
+            dict | AnalyzeResult: The response of the completed operation if it succeeds.
+        """
+        operation_location = response.headers.get("operation-location", "")
+        if not operation_location:
+            raise ValueError(
+                "Operation location not found in response headers.")
+        operation_id = operation_location.split('/')[-1].split('?')[0]
+
+        client = self._get_async_client()
+        interval = polling_interval_seconds
+        start_time = time.monotonic()
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                self._logger.info(f"Request {operation_id} polling cancelled.")
+                raise asyncio.CancelledError()
+
+            elapsed_time = time.monotonic() - start_time
+            if elapsed_time > timeout_seconds:
+                raise TimeoutError(
+                    f"Operation timed out after {timeout_seconds:.2f} seconds."
+                )
+
+            response = await client.get(operation_location, headers=self._headers)
+            if response.status_code not in (429, 503):
+                response.raise_for_status()
+                result = AnalyzeResult.from_response(response)
+                status = result.status.lower()
+                if status == "succeeded":
+                    self._logger.info(
+                        f"Request result is ready after {elapsed_time:.2f} seconds."
+                    )
+                    return result if as_analyze_result else result.to_dict()
+                elif status == "failed":
+                    self._logger.error(
+                        f"Request failed. Reason: {result.to_dict()}")
+                    raise RuntimeError("Request failed.")
+                self._logger.info(f"Request {operation_id} in progress ...")
+            else:
+                self._logger.info(
+                    f"Request {operation_id} throttled with status {response.status_code}, retrying ...")
+
+            retry_after = self._get_retry_after_seconds(response)
+            delay = retry_after if retry_after is not None else interval
+            delay = min(delay, max(0.0, timeout_seconds - elapsed_time))
+            interval = min(interval * backoff_factor,
+                           max_polling_interval_seconds)
+
+            if cancel_event is None:
+                await asyncio.sleep(delay)
+            else:
+                try:
+                    await asyncio.wait_for(cancel_event.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def analyze_batch_async(
+        self,
+        analyzer_id: str,
+        file_locations: Iterable[str],
+        max_concurrency: int = 4,
+        timeout_seconds: int = 300,
+        polling_interval_seconds: float = 1,
+        max_polling_interval_seconds: float = 10,
+        backoff_factor: float = 1.5,
+        as_analyze_result: bool = False,
+    ) -> AsyncIterator[BatchAnalyzeResult]:
+        """
+        Analyzes many files or URLs and yields each result as soon as it completes.
+
+        At most `max_concurrency` documents are in flight (submitted but not finished) at a time.
+        A single scheduler loop owns every operation-location and polls each one on its own
+        backoff schedule, so the number of documents does not change the number of sleeping tasks.
+        A failure in one document is reported on its result and does not stop the others.
+
+        Args:
+            analyzer_id (str): The ID of the analyzer to use.
+            file_locations (Iterable[str]): The paths to the files or the URLs to analyze.
+            max_concurrency (int, optional): The maximum number of documents in flight. Defaults to 4.
+            timeout_seconds (int, optional): The per-document time limit, measured from submission. Defaults to 300.
+            polling_interval_seconds (float, optional): The initial wait between polls of one operation. Defaults to 1.
+            max_polling_interval_seconds (float, optional): The upper bound for the wait between polls. Defaults to 10.
+            backoff_factor (float, optional): The multiplier applied to the wait after each poll. Defaults to 1.5.
+            as_analyze_result (bool, optional): Yield lazily parsed `AnalyzeResult` objects instead of dicts. Defaults to False.
+
+        Yields:
+            BatchAnalyzeResult: One result per file location, in completion order.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+
+        client = self._get_async_client()
+        queue = deque(file_locations)
+        in_flight = {}
+        sleeping = []
+
+        def finish(op, result=None, error=None):
+            if error is not None:
+                self._logger.error(
+                    f"Analysis of {op.file_location} failed: {error}")
+            return BatchAnalyzeResult(
+                file_location=op.file_location,
+                result=result,
+                error=error,
+                submit_seconds=op.submit_seconds,
+                total_seconds=time.monotonic() - op.started_at,
+            )
+
+        def schedule(op, response, now):
+            retry_after = self._get_retry_after_seconds(response)
+            op.next_poll_at = now + \
+                (retry_after if retry_after is not None else op.interval)
+            op.interval = min(op.interval * backoff_factor,
+                              max_polling_interval_seconds)
+            sleeping.append(op)
+
+        try:
+            while queue or in_flight or sleeping:
+                while queue and len(in_flight) + len(sleeping) < max_concurrency:
+                    op = _BatchOperation(
+                        file_location=queue.popleft(),
+                        started_at=time.monotonic(),
+                        interval=polling_interval_seconds,
+                    )
+                    task = asyncio.create_task(
+                        self.begin_analyze_async(analyzer_id, op.file_location))
+                    in_flight[task] = op
+
+                now = time.monotonic()
+                for op in [op for op in sleeping if op.next_poll_at <= now]:
+                    sleeping.remove(op)
+                    task = asyncio.create_task(
+                        client.get(op.operation_location, headers=self._headers))
+                    in_flight[task] = op
+
+                wait_seconds = None
+                if sleeping:
+                    wait_seconds = max(
+                        0.0, min(op.next_poll_at for op in sleeping) - now)
+                if not in_flight:
+                    await asyncio.sleep(wait_seconds)
+                    continue
+
+                done, _ = await asyncio.wait(
+                    in_flight, timeout=wait_seconds, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    op = in_flight.pop(task)
+                    now = time.monotonic()
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        yield finish(op, error=e)
+                        continue
+
+                    if not op.operation_location:
+                        op.submit_seconds = now - op.started_at
+                        op.operation_location = response.headers.get(
+                            "operation-location", "")
+                        if not op.operation_location:
+                            yield finish(op, error=ValueError(
+                                "Operation location not found in response headers."))
+                            continue
+                        schedule(op, response, now)
+                        continue
+
+                    try:
+                        if response.status_code not in (429, 503):
+                            response.raise_for_status()
+                            result = AnalyzeResult.from_response(response)
+                            status = result.status.lower()
+                            if status == "succeeded":
+                                yield finish(op, result=result if as_analyze_result else result.to_dict())
+                                continue
+                            if status == "failed":
+                                raise RuntimeError(
+                                    f"Request failed. Reason: {result.to_dict()}")
+                        if now - op.started_at > timeout_seconds:
+                            raise TimeoutError(
+                                f"Operation timed out after {timeout_seconds:.2f} seconds.")
+                    except Exception as e:
+                        yield finish(op, error=e)
+                        continue
+                    schedule(op, response, now)
+        finally:
+            for task in in_flight:
+                task.cancel()
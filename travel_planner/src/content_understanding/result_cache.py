@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+
+def hash_template(analyzer_template: dict = None, analyzer_template_path: str = "") -> str:
+    """
+    Returns a stable SHA-256 of an analyzer template, independent of key order and whitespace.
+
+    Args:
+        analyzer_template (dict, optional): The schema definition for the analyzer. Defaults to None.
+        analyzer_template_path (str, optional): The file path to the analyzer schema JSON file. Defaults to "".
+
+    Returns:
+        str: The hex digest of the canonical JSON form of the template.
+    """
+    if analyzer_template_path:
+        with open(analyzer_template_path, "r") as file:
+            analyzer_template = json.load(file)
+    if not analyzer_template:
+        raise ValueError("Analyzer schema must be provided.")
+
+    canonical = json.dumps(analyzer_template, sort_keys=True,
+                           separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def hash_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Returns the SHA-256 of a file's contents, reading it in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AnalysisResultCache:
+    """
+    An on-disk cache of analyze results keyed by document version and analyzer template.
+
+    Each entry is one file holding the raw result bytes. The file's mtime records when it was
+    written (for the TTL) and its atime is bumped on every hit (for least-recently-used eviction
+    once the cache grows beyond `max_bytes`).
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        ttl_seconds: int = 7 * 24 * 60 * 60,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self._cache_dir = Path(cache_dir)
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        self._ttl_seconds = ttl_seconds
+        self._max_bytes = max_bytes
+        self._logger = logging.getLogger(__name__)
+
+    async def make_key_async(self, cu_client, file_location: str, template_hash: str) -> Optional[str]:
+        """
+        Builds the cache key for a document analyzed with a given template.
+
+        Local files are identified by a hash of their contents. URLs are identified by the URL
+        together with its ETag (or Last-Modified) so that a changed document is re-analyzed.
+
+        Args:
+            cu_client (AzureContentUnderstandingClient): Used to look up the version of a URL.
+            file_location (str): The path to the file or the URL to analyze.
+            template_hash (str): The hash of the analyzer template, see `hash_template`.
+
+        Returns:
+            Optional[str]: The key, or None when the document version cannot be determined and
+            the result must not be cached.
+        """
+        if Path(file_location).exists():
+            document_id = "sha256:" + await asyncio.to_thread(hash_file, Path(file_location))
+        else:
+            version = await cu_client.get_document_version_async(file_location)
+            if not version:
+                self._logger.info(
+                    f"No ETag or Last-Modified for {file_location}; result will not be cached.")
+                return None
+            document_id = f"url:{file_location}#{version}"
+
+        return hashlib.sha256(f"{document_id}|{template_hash}".encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self._cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns the cached result bytes, or None on a miss or an expired entry."""
+        path = self._entry_path(key)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+
+        now = time.time()
+        if now - stat.st_mtime > self._ttl_seconds:
+            path.unlink(missing_ok=True)
+            return None
+
+        data = path.read_bytes()
+        os.utime(path, (now, stat.st_mtime))
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Stores the result bytes and evicts least recently used entries beyond `max_bytes`."""
+        path = self._entry_path(key)
+        temp_path = path.with_suffix(".tmp")
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+        self._evict()
+
+    async def get_async(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def put_async(self, key: str, data: bytes):
+        await asyncio.to_thread(self.put, key, data)
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        total_bytes = 0
+        for path in self._cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self._ttl_seconds:
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+            total_bytes += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total_bytes <= self._max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+            self._logger.info(f"Evicted cached result {path.name}.")
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from markdown_pdf import MarkdownPdf, Section
+
+# Per-worker state, built once by _init_worker and reused for every render in that process
+_WORKER_STATE = {}
+
+
+def _init_worker(user_css: Optional[str], font_dir: Optional[str]):
+    """Opens the font archive and warms up MuPDF's font cache."""
+    import pymupdf
+
+    _WORKER_STATE["user_css"] = user_css
+    _WORKER_STATE["archive"] = pymupdf.Archive(font_dir) if font_dir else "."
+
+    # Laying out a tiny document loads the default fonts, so the first real render is not slower
+    _render("# Warm up\n\nText with **bold**, *italic* and `code`.\n", None)
+
+
+def _render(markdown: str, file_path: Optional[str]) -> str:
+    pdf = MarkdownPdf()
+    pdf.add_section(Section(markdown, root=_WORKER_STATE["archive"]),
+                    user_css=_WORKER_STATE["user_css"])
+    if file_path:
+        pdf.save(file_path)
+    return file_path
+
+
+def render_markdown_to_pdf(markdown: str, file_path: str, user_css: Optional[str] = None) -> str:
+    """Renders markdown into a PDF file in the current process. Used when no render service is running."""
+    pdf = MarkdownPdf()
+    pdf.add_section(Section(markdown), user_css=user_css)
+    pdf.save(file_path)
+    return file_path
+
+
+class PdfRenderService:
+    """
+    Renders markdown to PDF in a pool of worker processes so the agent's event loop stays free.
+
+    Each worker opens the font archive and loads fonts once at startup and reuses them
+    across renders. At most `max_workers + max_queue` renders are accepted at a time; further
+    callers wait for a slot, which bounds memory when many itineraries are saved at once.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue: int = 16,
+        user_css: Optional[str] = None,
+        font_dir: Optional[str] = None,
+    ):
+        self._max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self._max_workers,
+            initializer=_init_worker,
+            initargs=(user_css, font_dir),
+        )
+        self._slots = asyncio.Semaphore(self._max_workers + max_queue)
+        self._logger = logging.getLogger(__name__)
+
+    async def render(self, markdown: str, file_path: str) -> str:
+        """
+        Renders markdown into a PDF file without blocking the event loop.
+
+        Args:
+            markdown (str): The markdown document to render.
+            file_path (str): The path of the PDF file to write.
+
+        Returns:
+            str: The path to the saved PDF file.
+        """
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            file_path = await loop.run_in_executor(self._executor, _render, markdown, str(file_path))
+        self._logger.info("Rendered PDF %s", file_path)
+        return file_path
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
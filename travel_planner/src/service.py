@@ -0,0 +1,277 @@
+"""
+Service mode for the travel planner: processes a queue of itineraries concurrently in one process.
+
+Usage:
+    python src/service.py URL [URL ...] [--urls-file FILE] [--concurrency N] [--output-dir DIR]
+
+Shared resources (credentials, the Content Understanding client and analyzer, the result
+cache, the PDF render service and the pooled agent) are created once. Each itinerary runs with
+its own `config.ItineraryContext`, so tool calls never read another request's state.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+from azure.identity.aio import DefaultAzureCredential, get_bearer_token_provider
+from azure.ai.projects.aio import AIProjectClient
+from azure.ai.projects.models import MessageRole
+
+import config
+from agent_pool import AgentPool, RequestTimings
+from app import (
+    AGENT_INSTRUCTIONS,
+    ANALYSIS_CACHE_DIR,
+    ANALYSIS_CACHE_MAX_BYTES,
+    ANALYSIS_CACHE_TTL_SECONDS,
+    AZ_FOUNDRY_PROJECT_CONNECTION_STRINGS,
+    AZ_MODEL_DEPLOYMENT_NAME,
+    AZURE_AI_API_VERSION,
+    AZURE_AI_ENDPOINT,
+    BLOB_STORE_BASE_URL,
+    BLOB_STORE_DIR,
+)
+from content_understanding.analyzer_registry import AnalyzerRegistry
+from content_understanding.blob_store import LocalBlobStore
+from content_understanding.content_understanding_client import AzureContentUnderstandingClient
+from content_understanding.result_cache import AnalysisResultCache, hash_template
+from pdf_renderer import PdfRenderService
+from tool_functions import travel_functions
+
+ANALYZER_TEMPLATE_PATH = Path(os.path.dirname(
+    __file__)) / "analyzer_templates" / "itinerary_template.json"
+DEFAULT_OUTPUT_DIR = Path(os.path.dirname(__file__)) / "output"
+
+# Tools whose time is reported as the analysis and PDF stages
+ANALYSIS_TOOLS = ("process_itinerary", "process_itineraries")
+PDF_TOOLS = ("save_to_pdf",)
+
+
+@dataclass
+class ItineraryJob:
+    request_id: str
+    doc_url: str
+    output_path: Path
+
+
+@dataclass
+class ItineraryOutcome:
+    job: ItineraryJob
+    succeeded: bool
+    total_seconds: float
+    timings: RequestTimings = field(default_factory=RequestTimings)
+    response: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def stage_seconds(self) -> dict:
+        analysis = sum(self.timings.tool_seconds.get(name, 0.0)
+                       for name in ANALYSIS_TOOLS)
+        pdf = sum(self.timings.tool_seconds.get(name, 0.0)
+                  for name in PDF_TOOLS)
+        return {
+            "agent_setup": self.timings.agent_seconds,
+            "analysis": analysis,
+            "agent_run": max(0.0, self.timings.run_seconds - self.timings.total_tool_seconds),
+            "pdf_save": pdf,
+            "total": self.total_seconds,
+        }
+
+
+class ItineraryService:
+    """Runs itinerary requests on a pooled agent with bounded concurrency."""
+
+    def __init__(
+        self,
+        project_client,
+        agent_pool: AgentPool,
+        base_context: config.ItineraryContext,
+        output_dir: Path = DEFAULT_OUTPUT_DIR,
+        concurrency: int = 4,
+    ):
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+        self._project_client = project_client
+        self._agent_pool = agent_pool
+        self._base_context = base_context
+        self._output_dir = Path(output_dir)
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        self._concurrency = concurrency
+
+    def create_job(self, doc_url: str) -> ItineraryJob:
+        request_id = uuid.uuid4().hex[:8]
+        return ItineraryJob(request_id=request_id, doc_url=doc_url,
+                            output_path=self._output_dir / f"itinerary-{request_id}.pdf")
+
+    async def process(self, job: ItineraryJob) -> ItineraryOutcome:
+        """Analyzes one itinerary, runs the agent on it and saves the new itinerary as a PDF."""
+        start = time.perf_counter()
+        token = config.use(self._base_context.for_request(job.request_id))
+        try:
+            thread_id, run, timings = await self._agent_pool.run(
+                model=AZ_MODEL_DEPLOYMENT_NAME,
+                instructions=AGENT_INSTRUCTIONS,
+                functions=travel_functions,
+                bing_connection_name=os.environ.get("BING_CONNECTION_NAME"),
+                role=MessageRole.USER,
+                content=(
+                    f"Suggest additional activities based on my existing itinerary at {job.doc_url}."
+                    "I would like to receive the new itinerary as a PDF file."
+                    f"Please save the new itinerary to {job.output_path}."
+                ),
+            )
+            try:
+                messages = await self._project_client.agents.list_messages(thread_id=thread_id)
+                last_msg = messages.get_last_text_message_by_role(
+                    MessageRole.AGENT)
+            finally:
+                await self._project_client.agents.delete_thread(thread_id)
+        except Exception as e:
+            logging.error("[%s] Failed to process %s: %s",
+                          job.request_id, job.doc_url, e)
+            return ItineraryOutcome(job=job, succeeded=False, error=str(e),
+                                    total_seconds=time.perf_counter() - start)
+        finally:
+            config.reset(token)
+
+        succeeded = run.status == "completed"
+        if not succeeded:
+            logging.error("[%s] Run failed with status: %s, error: %s",
+                          job.request_id, run.status, run.last_error)
+        return ItineraryOutcome(
+            job=job,
+            succeeded=succeeded,
+            total_seconds=time.perf_counter() - start,
+            timings=timings,
+            response=last_msg.text.value if last_msg else None,
+            error=None if succeeded else str(run.last_error),
+        )
+
+    async def run(self, doc_urls: List[str]) -> List[ItineraryOutcome]:
+        """Processes every itinerary with at most `concurrency` in flight and logs a report."""
+        queue = asyncio.Queue()
+        for doc_url in doc_urls:
+            queue.put_nowait(self.create_job(doc_url))
+        outcomes = []
+
+        async def worker():
+            while True:
+                try:
+                    job = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                outcome = await self.process(job)
+                logging.info("[%s] %s %s in %.2fs", job.request_id, job.doc_url,
+                             "completed" if outcome.succeeded else "failed", outcome.total_seconds)
+                outcomes.append(outcome)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(min(self._concurrency, len(doc_urls)))))
+        log_report(outcomes, time.perf_counter() - start)
+        return outcomes
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def log_report(outcomes: List[ItineraryOutcome], elapsed_seconds: float):
+    """Logs throughput (itineraries/min) and p50/p95/max latency per stage."""
+    completed = [outcome for outcome in outcomes if outcome.succeeded]
+    throughput = len(completed) / elapsed_seconds * 60 if elapsed_seconds else 0.0
+    logging.info("📈 %d/%d itineraries completed in %.1fs (%.2f itineraries/min)",
+                 len(completed), len(outcomes), elapsed_seconds, throughput)
+    if not completed:
+        return
+    for stage in completed[0].stage_seconds:
+        values = [outcome.stage_seconds[stage] for outcome in completed]
+        logging.info("   %-12s p50 %.2fs  p95 %.2fs  max %.2fs", stage,
+                     _percentile(values, 0.5), _percentile(values, 0.95), max(values))
+
+
+def positive_int(value: str) -> int:
+    """An argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+async def main(doc_urls: List[str], concurrency: int, output_dir: Path):
+    config.PDF_RENDERER = PdfRenderService(max_workers=concurrency)
+    credential = DefaultAzureCredential()
+    cu_client = None
+    try:
+        token_provider = get_bearer_token_provider(
+            credential, "https://cognitiveservices.azure.com/.default")
+        cu_client = await AzureContentUnderstandingClient.create(
+            endpoint=AZURE_AI_ENDPOINT,
+            api_version=AZURE_AI_API_VERSION,
+            token_provider=token_provider,
+            pool_maxsize=max(10, concurrency * 2),
+            blob_store=LocalBlobStore(BLOB_STORE_DIR, BLOB_STORE_BASE_URL)
+            if BLOB_STORE_DIR and BLOB_STORE_BASE_URL else None,
+        )
+        analyzer_registry = AnalyzerRegistry(cu_client)
+        base_context = config.ItineraryContext(
+            cu_client=cu_client,
+            analyzer_id=await analyzer_registry.get_or_create_async(ANALYZER_TEMPLATE_PATH),
+            result_cache=AnalysisResultCache(
+                cache_dir=ANALYSIS_CACHE_DIR,
+                ttl_seconds=ANALYSIS_CACHE_TTL_SECONDS,
+                max_bytes=ANALYSIS_CACHE_MAX_BYTES,
+            ),
+            analyzer_template_hash=hash_template(
+                analyzer_template_path=ANALYZER_TEMPLATE_PATH),
+            pdf_renderer=config.PDF_RENDERER,
+            batch_max_concurrency=config.BATCH_MAX_CONCURRENCY,
+        )
+
+        project_client = AIProjectClient.from_connection_string(
+            credential=credential, conn_str=AZ_FOUNDRY_PROJECT_CONNECTION_STRINGS
+        )
+        agent_pool = AgentPool(project_client)
+        try:
+            service = ItineraryService(project_client, agent_pool, base_context,
+                                       output_dir=output_dir, concurrency=concurrency)
+            await service.run(doc_urls)
+        finally:
+            await agent_pool.close()
+            await project_client.close()
+            logging.info("Project client closed.")
+        await analyzer_registry.aclose()
+    finally:
+        if cu_client is not None:
+            await cu_client.aclose()
+        await credential.close()
+        logging.info("DefaultAzureCredential closed.")
+        config.PDF_RENDERER.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Process many travel itineraries concurrently.")
+    parser.add_argument("urls", nargs="*",
+                        help="Itinerary document URLs or local paths.")
+    parser.add_argument("--urls-file",
+                        help="A file with one itinerary URL or path per line.")
+    parser.add_argument("--concurrency", type=positive_int, default=4,
+                        help="The maximum number of itineraries processed at once.")
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR,
+                        help="Where to save the generated itinerary PDFs.")
+    args = parser.parse_args()
+
+    doc_urls = list(args.urls)
+    if args.urls_file:
+        with open(args.urls_file, "r") as file:
+            doc_urls.extend(line.strip() for line in file if line.strip())
+    if not doc_urls:
+        parser.error("Provide at least one itinerary URL or --urls-file.")
+
+    asyncio.run(main(doc_urls, args.concurrency, args.output_dir))
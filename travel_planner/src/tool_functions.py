@@ -1,9 +1,12 @@
-import sys
+import asyncio
 import json
-from typing import Any, Callable, Set
+from pathlib import Path
+from typing import Any, Callable, List, Set
 import logging
+import httpx
 import config
-from markdown_pdf import MarkdownPdf, Section
+from content_understanding.analyze_result import AnalyzeResult
+from pdf_renderer import render_markdown_to_pdf
 
 logging.basicConfig(level=logging.INFO)
 
@@ -23,18 +26,23 @@ async def save_to_pdf(itinerary: str, file_path: str) -> str:
         logging.error("No itinerary provided.")
         return json.dumps({"error": "No itinerary provided."})
 
+    context = config.current()
     written = False
     try:
         logging.info("Saving the itinerary as a PDF in %s...", file_path)
 
-        pdf = MarkdownPdf()
-        written = pdf.add_section(Section(itinerary))
-        pdf.save(file_path)
+        # Rendering is CPU-bound, so it runs in the render service's worker processes
+        # (or a thread when none is configured) instead of on the agent's event loop.
+        if context.pdf_renderer is not None:
+            await context.pdf_renderer.render(itinerary, file_path)
+        else:
+            await asyncio.to_thread(render_markdown_to_pdf, itinerary, file_path)
+        written = True
     except Exception as e:
         logging.error(
             "Failed to save the itinerary as a PDF. Error message:\n %s", e)
 
-    return json.dumps({"wrote": written})
+    return json.dumps({"wrote": written, "path": str(file_path)})
 
 
 async def process_itinerary(doc_url: str) -> str:
@@ -52,42 +60,155 @@ async def process_itinerary(doc_url: str) -> str:
         logging.error("No document URL provided.")
         return json.dumps({"error": "No document URL provided."})
 
-    if config.CU_CLIENT is None or config.ANALYZER_ID is None:
+    context = config.current()
+    if context.cu_client is None or context.analyzer_id is None:
         logging.error(
             "Content Understanding client or analyzer ID not initialized.")
         return json.dumps({"error": "Content Understanding client or analyzer ID not initialized."})
 
+    cache_key, output = await _get_cached_result(context, doc_url)
+    if output is not None:
+        logging.info("⚡ Using cached analysis result for %s", doc_url)
+        itinerary = _extract_itinerary(output)
+        return json.dumps(itinerary)
+
     try:
-        analyze_file = config.CU_CLIENT.begin_analyze(
-            analyzer_id=config.ANALYZER_ID,
+        analyze_file = await context.cu_client.begin_analyze_async(
+            analyzer_id=context.analyzer_id,
             file_location=doc_url
         )
-    except (ConnectionError, TimeoutError, ValueError) as e:
+        # Awaiting the poll lets the agent loop keep serving other work while the document is analyzed.
+        output = await context.cu_client.poll_result_async(
+            analyze_file, as_analyze_result=True)
+    except (ConnectionError, TimeoutError, RuntimeError, ValueError, httpx.HTTPError) as e:
         logging.error("Failed to analyze the document. Error message:\n %s", e)
-        config.CU_CLIENT.delete_analyzer(analyzer_id=config.ANALYZER_ID)
-        sys.exit(1)
-    output = config.CU_CLIENT.poll_result(analyze_file)
+        return json.dumps({"error": f"Failed to analyze the document: {e}"})
+    await _cache_result(context, cache_key, output)
 
-    logging.info("📊 Status of the analyze operation: %s", output["status"])
-    logging.info("🔎 Analyze operation completed with the result:")
-    logging.info(json.dumps(output, indent=2))
+    logging.info("📊 Status of the analyze operation: %s (%d bytes)",
+                 output.status, output.size)
+    # The full payload can be megabytes for multi-page documents; only decode and log it when debugging.
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("🔎 Analyze operation completed with the result:\n%s",
+                      output.raw.decode("utf-8"))
 
-    itinerary = {"raw": output["result"]["contents"][0]["markdown"],
-                 "start_date": output["result"]["contents"][0]["fields"]["StartDate"]["valueDate"],
-                 "end_date": output["result"]["contents"][0]["fields"]["EndDate"]["valueDate"],
-                 "existing_plans": output["result"]["contents"][0]["fields"]["ExistingPlans"]["valueString"]}
+    itinerary = _extract_itinerary(output)
 
-    logging.info(" Processed Existing Itinerary:\n\n %s\n\n", itinerary)
+    logging.info(" Processed Existing Itinerary from %s (%s to %s)",
+                 doc_url, itinerary["start_date"], itinerary["end_date"])
     return json.dumps(itinerary)
 
 
+async def process_itineraries(doc_locations: List[str]) -> str:
+    """
+    Sends several itinerary documents to the Azure Content Understanding service's document
+    analyzer at once. Use this instead of process_itinerary when the user provides more than one
+    itinerary URL or a folder of itinerary PDFs.
+
+    :param doc_locations (List[str]): The HTTP URLs, local file paths or local folders of PDF files to analyze.
+
+    :return: A list of processed itineraries (or per-document errors) as a JSON string.
+    :rtype: str
+    """
+
+    if not doc_locations:
+        logging.error("No document locations provided.")
+        return json.dumps({"error": "No document locations provided."})
+
+    context = config.current()
+    if context.cu_client is None or context.analyzer_id is None:
+        logging.error(
+            "Content Understanding client or analyzer ID not initialized.")
+        return json.dumps({"error": "Content Understanding client or analyzer ID not initialized."})
+
+    file_locations = []
+    for location in doc_locations:
+        if Path(location).is_dir():
+            file_locations.extend(str(path)
+                                  for path in sorted(Path(location).glob("*.pdf")))
+        else:
+            file_locations.append(location)
+
+    itineraries = []
+    cache_keys = {}
+    for location, (cache_key, output) in zip(
+            file_locations, await asyncio.gather(*(_get_cached_result(context, location) for location in file_locations))):
+        if output is not None:
+            logging.info("⚡ Using cached analysis result for %s", location)
+            itinerary = _extract_itinerary(output)
+            itinerary["source"] = location
+            itinerary["elapsed_seconds"] = 0
+            itineraries.append(itinerary)
+        else:
+            cache_keys[location] = cache_key
+
+    async for analyzed in context.cu_client.analyze_batch_async(
+        analyzer_id=context.analyzer_id,
+        file_locations=list(cache_keys),
+        max_concurrency=context.batch_max_concurrency,
+        as_analyze_result=True,
+    ):
+        logging.info("📄 %s finished in %.2fs (submit %.2fs)",
+                     analyzed.file_location, analyzed.total_seconds, analyzed.submit_seconds)
+        if analyzed.succeeded:
+            await _cache_result(context, cache_keys[analyzed.file_location], analyzed.result)
+            itinerary = _extract_itinerary(analyzed.result)
+        else:
+            itinerary = {"error": str(analyzed.error)}
+        itinerary["source"] = analyzed.file_location
+        itinerary["elapsed_seconds"] = round(analyzed.total_seconds, 2)
+        itineraries.append(itinerary)
+
+    return json.dumps(itineraries)
+
+
+async def _get_cached_result(context: config.ItineraryContext, file_location: str):
+    """Returns (cache key, cached analyze result or None). The key is None when caching is off or not possible."""
+    if context.result_cache is None or context.analyzer_template_hash is None:
+        return None, None
+
+    try:
+        cache_key = await context.result_cache.make_key_async(
+            context.cu_client, file_location, context.analyzer_template_hash)
+        if cache_key is None:
+            return None, None
+        data = await context.result_cache.get_async(cache_key)
+    except OSError as e:
+        logging.warning("Analysis cache lookup failed: %s", e)
+        return None, None
+    return cache_key, AnalyzeResult(data) if data is not None else None
+
+
+async def _cache_result(context: config.ItineraryContext, cache_key: str, output: AnalyzeResult):
+    if cache_key is None or context.result_cache is None:
+        return
+    try:
+        await context.result_cache.put_async(cache_key, output.raw)
+    except OSError as e:
+        logging.warning("Failed to cache the analysis result: %s", e)
+
+
+def _extract_itinerary(output: AnalyzeResult) -> dict:
+    """Picks the itinerary fields out of a completed analyze operation without decoding the rest of it."""
+    values = output.get_field_values(
+        ("StartDate", "EndDate", "ExistingPlans"), include_markdown=True)
+    return {"raw": values["markdown"],
+            "start_date": values["StartDate"],
+            "end_date": values["EndDate"],
+            "existing_plans": values["ExistingPlans"]}
+
+
 # Example User Input for Each Function
 # 1. Process Itinerary
 #     User Input: "Process the travel itinerary document available at http://www.example.com/itinerary.pdf."
 #     User Input: "http://www.example.com/itinerary.pdf."
 #     User Input: "My travel itinerary with my flight details and hotel information is available at http://www.example.com/intinerary.pdf"
+# 2. Process Itineraries
+#     User Input: "Process the itineraries at http://www.example.com/a.pdf and http://www.example.com/b.pdf."
+#     User Input: "Process every itinerary PDF in the folder ./itineraries."
 # Statically defined user functions for fast reference
 travel_functions: Set[Callable[..., Any]] = {
     save_to_pdf,
     process_itinerary,
+    process_itineraries,
 }
@@ -0,0 +1,103 @@
+"""Compare a new httpx client per upstream call with the server's shared pooled client.
+
+Usage:
+    python benchmark_http_client.py [--requests N] [--concurrency N] [--latency-ms MS]
+
+Starts fake_upstream on a local port and issues the same lookups both ways. The stand-in is
+plain HTTP on loopback, so it only shows the cost of building a client and opening a TCP
+connection per call; against api.openweathermap.org each new client also pays for DNS and a
+TLS handshake, so the real difference is larger.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import statistics
+import time
+
+import httpx
+import uvicorn
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _run(name: str, lookup, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await lookup(f"City{i % 50},US")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{name:<22} {total / elapsed:8.1f} req/s   "
+          f"p50 {statistics.median(latencies) * 1000:7.2f} ms   "
+          f"p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:7.2f} ms")
+
+
+async def main(total: int, concurrency: int, latency_ms: float):
+    os.environ["FAKE_UPSTREAM_LATENCY_MS"] = str(latency_ms)
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}/data/2.5"
+    os.environ["OPENWEATHER_BASE_URL"] = base_url
+    # Measure the connections alone, without the upstream rate limiter
+    os.environ["OPENWEATHER_RATE_LIMIT_PER_MINUTE"] = "0"
+
+    # Imported after the environment is set, since both read it at import time
+    import fake_upstream
+    import weather_server
+
+    # Per-request log lines would dominate the measurement
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    upstream = uvicorn.Server(uvicorn.Config(
+        fake_upstream.app, host="127.0.0.1", port=port, log_level="warning"))
+    upstream_task = asyncio.create_task(upstream.serve())
+    while not upstream.started:
+        await asyncio.sleep(0.01)
+
+    params = {"appid": "benchmark", "units": "metric"}
+
+    async def per_call_client(query: str):
+        # What get_weather did before: a new client (and connection pool) for every call
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{base_url}/weather", params={**params, "q": query})
+            response.raise_for_status()
+            return response.json()
+
+    async def shared_client(query: str):
+        return await weather_server.fetch_current_weather(query, params["appid"])
+
+    try:
+        print(f"{total} lookups, concurrency {concurrency}, "
+              f"upstream latency {latency_ms:g} ms\n")
+        await _run("client per call", per_call_client, total, concurrency)
+        async with weather_server.http_client_lifespan():
+            await _run("shared pooled client", shared_client, total, concurrency)
+    finally:
+        upstream.should_exit = True
+        await upstream_task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000,
+                        help="The number of lookups to issue per mode.")
+    parser.add_argument("--concurrency", type=int, default=50,
+                        help="The maximum number of lookups in flight.")
+    parser.add_argument("--latency-ms", type=float, default=5,
+                        help="The simulated upstream response time.")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.latency_ms))
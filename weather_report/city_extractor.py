@@ -0,0 +1,217 @@
+"""Local city and country extraction for weather queries, tried before asking the LLM."""
+
+import csv
+import re
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+DEFAULT_CITIES_PATH = Path(__file__).parent / "data" / "cities.csv"
+
+# Words that introduce a place, e.g. "weather in London" or "forecast for Paris"
+PREPOSITIONS = {"in", "for", "at", "near", "around", "to"}
+
+US_STATES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca",
+    "colorado": "co", "connecticut": "ct", "delaware": "de", "florida": "fl", "georgia": "ga",
+    "hawaii": "hi", "idaho": "id", "illinois": "il", "indiana": "in", "iowa": "ia",
+    "kansas": "ks", "kentucky": "ky", "louisiana": "la", "maine": "me", "maryland": "md",
+    "massachusetts": "ma", "michigan": "mi", "minnesota": "mn", "mississippi": "ms",
+    "missouri": "mo", "montana": "mt", "nebraska": "ne", "nevada": "nv", "new hampshire": "nh",
+    "new jersey": "nj", "new mexico": "nm", "new york": "ny", "north carolina": "nc",
+    "north dakota": "nd", "ohio": "oh", "oklahoma": "ok", "oregon": "or", "pennsylvania": "pa",
+    "rhode island": "ri", "south carolina": "sc", "south dakota": "sd", "tennessee": "tn",
+    "texas": "tx", "utah": "ut", "vermont": "vt", "virginia": "va", "washington": "wa",
+    "west virginia": "wv", "wisconsin": "wi", "wyoming": "wy", "district of columbia": "dc",
+}
+
+CANADIAN_PROVINCES = {
+    "ontario": "on", "quebec": "qc", "british columbia": "bc", "alberta": "ab",
+    "manitoba": "mb", "nova scotia": "ns", "saskatchewan": "", "new brunswick": "",
+    "newfoundland": "", "prince edward island": "",
+}
+
+COUNTRIES = {
+    "united kingdom": "gb", "uk": "gb", "great britain": "gb", "britain": "gb", "england": "gb",
+    "scotland": "gb", "wales": "gb", "northern ireland": "gb",
+    "united states": "us", "united states of america": "us", "usa": "us", "america": "us",
+    "france": "fr", "germany": "de", "spain": "es", "italy": "it", "portugal": "pt",
+    "netherlands": "nl", "holland": "nl", "belgium": "be", "switzerland": "ch", "austria": "at",
+    "ireland": "ie", "denmark": "dk", "sweden": "se", "norway": "no", "finland": "fi",
+    "iceland": "is", "poland": "pl", "czech republic": "cz", "czechia": "cz", "hungary": "hu",
+    "slovakia": "sk", "romania": "ro", "bulgaria": "bg", "serbia": "rs", "croatia": "hr",
+    "slovenia": "si", "ukraine": "ua", "russia": "ru", "estonia": "ee", "latvia": "lv",
+    "lithuania": "lt", "greece": "gr", "turkey": "tr", "turkiye": "tr", "luxembourg": "lu",
+    "canada": "ca", "mexico": "mx", "cuba": "cu", "puerto rico": "pr", "jamaica": "jm",
+    "colombia": "co", "peru": "pe", "ecuador": "ec", "venezuela": "ve", "chile": "cl",
+    "argentina": "ar", "uruguay": "uy", "brazil": "br", "egypt": "eg", "morocco": "ma",
+    "tunisia": "tn", "nigeria": "ng", "ghana": "gh", "kenya": "ke", "ethiopia": "et",
+    "tanzania": "tz", "uganda": "ug", "south africa": "za", "uae": "ae",
+    "united arab emirates": "ae", "qatar": "qa", "saudi arabia": "sa", "kuwait": "kw",
+    "oman": "om", "iran": "ir", "iraq": "iq", "israel": "il", "jordan": "jo", "lebanon": "lb",
+    "pakistan": "pk", "india": "in", "bangladesh": "bd", "nepal": "np", "sri lanka": "lk",
+    "japan": "jp", "south korea": "kr", "korea": "kr", "china": "cn", "hong kong": "hk",
+    "macau": "mo", "taiwan": "tw", "philippines": "ph", "thailand": "th", "vietnam": "vn",
+    "malaysia": "my", "singapore": "sg", "indonesia": "id", "australia": "au",
+    "new zealand": "nz",
+}
+
+_TOKEN_PATTERN = re.compile(r"[^\W_]+(?:['’-][^\W_]+)*|,")
+
+
+@dataclass
+class CityMatch:
+    city: str
+    country_code: Optional[str]
+    # False when the rules found a likely place but could not pin it down; ask the LLM instead
+    confident: bool
+    # "gazetteer" (a bundled city) or "pattern" (a place phrase with a known state or country)
+    rule: str
+
+
+def normalize_token(token: str) -> str:
+    """Fold case and strip accents, so "Zürich" and "zurich" index the same."""
+    decomposed = unicodedata.normalize("NFKD", token)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold().replace("’", "'")
+
+
+def tokenize(text: str) -> List[Tuple[str, str]]:
+    """Split text into (normalized, original) word tokens, keeping commas as their own token."""
+    # Dots are dropped rather than split on, so "St. Louis" and "D.C." read as "st louis" and "dc"
+    return [(normalize_token(token), token) for token in _TOKEN_PATTERN.findall(text.replace(".", ""))]
+
+
+class _Trie:
+    """A word-level trie mapping token sequences to values, searched for the longest match."""
+
+    def __init__(self):
+        self._root: dict = {}
+
+    def add(self, tokens: Sequence[str], value):
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(None, []).append(value)
+
+    def longest_match(self, tokens: Sequence[str], start: int) -> Tuple[int, list]:
+        """Return (end index, values) of the longest phrase starting at `start`, or (start, [])."""
+        node, end, values = self._root, start, []
+        for i in range(start, len(tokens)):
+            node = node.get(tokens[i])
+            if node is None:
+                break
+            if None in node:
+                end, values = i + 1, node[None]
+        return end, values
+
+
+class CityExtractor:
+    """
+    Finds the city (and country code) in a weather query without a model call.
+
+    Cities come from a bundled gazetteer (`data/cities.csv`: city, ISO country code and
+    `|`-separated aliases; for names shared by several cities the first row is the default).
+    A state, province or country right after the city ("Paris, TX", "Scranton, Pennsylvania",
+    "Perth Scotland") picks the country. A place after "in"/"for"/... that is not in the
+    gazetteer is accepted only when such a qualifier makes its country certain.
+    """
+
+    def __init__(self, cities_path: Path = DEFAULT_CITIES_PATH):
+        self._cities = _Trie()
+        with open(cities_path, "r", encoding="utf-8", newline="") as file:
+            for row in csv.DictReader(file):
+                names = [row["city"]] + \
+                    [alias for alias in (row.get("aliases") or "").split("|") if alias]
+                for name in names:
+                    self._cities.add([token for token, _ in tokenize(name)],
+                                     (row["city"], row["country_code"]))
+
+        # Region names and codes -> country codes; two-letter codes only count after a comma
+        self._regions = _Trie()
+        self._abbreviations: Dict[str, Set[str]] = {}
+        for names, country_code in ((US_STATES, "us"), (CANADIAN_PROVINCES, "ca")):
+            for name, abbreviation in names.items():
+                self._regions.add(name.split(), country_code)
+                if abbreviation:
+                    self._abbreviations.setdefault(
+                        abbreviation, set()).add(country_code)
+        for name, country_code in COUNTRIES.items():
+            self._regions.add(name.split(), country_code)
+            self._abbreviations.setdefault(
+                country_code, set()).add(country_code)
+        self._abbreviations.setdefault("uk", set()).add("gb")
+
+    def extract(self, query: str) -> Optional[CityMatch]:
+        """Return the best local match for the query, or None when it names no place we recognize."""
+        tokens = tokenize(query)
+        words = [token for token, _ in tokens]
+
+        match = self._match_gazetteer(words)
+        if match is not None:
+            return match
+        return self._match_pattern(tokens, words)
+
+    def _match_gazetteer(self, words) -> Optional[CityMatch]:
+        best = None
+        i = 0
+        while i < len(words):
+            end, entries = self._cities.longest_match(words, i)
+            if not entries:
+                i += 1
+                continue
+            after_preposition = i > 0 and words[i - 1] in PREPOSITIONS
+            if best is None or (after_preposition and not best[2]):
+                best = (i, end, after_preposition, entries)
+            i = end
+
+        if best is None:
+            return None
+        _, end, _, entries = best
+        codes, _ = self._match_qualifier(words, end)
+        for city, country_code in entries:
+            if not codes or country_code in codes:
+                return CityMatch(city=city, country_code=country_code, confident=True, rule="gazetteer")
+        # A known city name with an explicit, unambiguous country we have no row for
+        if len(codes) == 1:
+            return CityMatch(city=entries[0][0], country_code=next(iter(codes)), confident=True, rule="gazetteer")
+        return CityMatch(city=entries[0][0], country_code=entries[0][1], confident=False, rule="gazetteer")
+
+    def _match_pattern(self, tokens, words) -> Optional[CityMatch]:
+        for i, word in enumerate(words):
+            if word not in PREPOSITIONS:
+                continue
+            # The place name is up to 4 words, ending at a comma or a region name. Without a
+            # comma it must be capitalized, so "in Smalltown today" does not take "today".
+            start = i + 1
+            comma = "," in words[start:start + 5]
+            end = start
+            while end < len(words) and end - start < 4 and words[end] != ",":
+                if end > start and self._regions.longest_match(words, end)[1]:
+                    break
+                if not comma and not tokens[end][1][:1].isupper():
+                    break
+                end += 1
+            if end == start or self._regions.longest_match(words, start)[0] >= end:
+                continue
+
+            city = " ".join(original for _, original in tokens[start:end])
+            if city.islower():
+                city = city.title()
+            codes, _ = self._match_qualifier(words, end)
+            if len(codes) == 1:
+                return CityMatch(city=city, country_code=next(iter(codes)), confident=True, rule="pattern")
+            return CityMatch(city=city, country_code=None, confident=False, rule="pattern")
+        return None
+
+    def _match_qualifier(self, words, start: int) -> Tuple[Set[str], int]:
+        """Return the country codes named by a state, province or country at `start`, and its end."""
+        comma = start < len(words) and words[start] == ","
+        if comma:
+            start += 1
+        end, codes = self._regions.longest_match(words, start)
+        if codes:
+            return set(codes), end
+        if comma and start < len(words) and words[start] in self._abbreviations:
+            return self._abbreviations[words[start]], start + 1
+        return set(), start
@@ -6,28 +6,44 @@ import time
 import sys
 import os
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
-async def check_server_ready(url: str, max_attempts: int = 30) -> bool:
-    """Check if the server is ready to accept connections."""
+async def check_server_ready(url: str, timeout_seconds: float = 30, process: Optional[subprocess.Popen] = None) -> bool:
+    """
+    Wait until the server's /readyz endpoint reports ready.
+
+    Probes start 10 ms apart and back off exponentially to 500 ms, over one shared client, so
+    a server that comes up quickly is detected within milliseconds of being ready.
+    """
     import httpx
 
-    for attempt in range(max_attempts):
-        try:
-            async with httpx.AsyncClient() as client:
-                # Try to connect to the server health endpoint
-                response = await client.get(f"{url.replace('/mcp', '')}/", timeout=1.0)
-                # 404 is OK, means server is running
-                if response.status_code in [200, 404]:
+    ready_url = f"{url.replace('/mcp', '')}/readyz"
+    deadline = time.perf_counter() + timeout_seconds
+    delay = 0.01
+    last_status = None
+    async with httpx.AsyncClient(timeout=1.0) as client:
+        while time.perf_counter() < deadline:
+            if process is not None and process.poll() is not None:
+                print(f"Server exited with code {process.returncode}")
+                return False
+            try:
+                response = await client.get(ready_url)
+                if response.status_code == 200:
                     return True
-        except (httpx.RequestError, httpx.TimeoutException):
-            pass
+                # 503 means the server is up but not ready yet; report why once it changes
+                checks = response.json().get("checks")
+                if checks != last_status:
+                    print(f"Waiting for server... {checks}")
+                    last_status = checks
+            except (httpx.RequestError, ValueError):
+                pass
 
-        await asyncio.sleep(1)
-        print(f"Waiting for server... (attempt {attempt + 1}/{max_attempts})")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
 
     return False
 
@@ -68,13 +84,18 @@ async def run_sample_queries():
     print("Processing sample queries:")
     print("-" * 30)
 
-    for query in sample_queries:
-        try:
-            print(f"\nProcessing: '{query}'")
-            response = await client.process_weather_query(query)
-            print(f"Response: {response}")
-        except Exception as e:
-            print(f"Error processing '{query}': {e}")
+    # All sample queries run together; identical cities are fetched once
+    try:
+        start = time.perf_counter()
+        results = await client.process_weather_queries(sample_queries)
+        for result in results:
+            print(f"\nProcessing: '{result.query}'")
+            print(f"Response: {result.response}")
+            print(f"   extract {result.extract_seconds:.2f}s, fetch {result.fetch_seconds:.2f}s"
+                  f"{' (shared)' if result.shared_fetch else ''}, total {result.total_seconds:.2f}s")
+        print(f"\n{len(results)} queries in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        print(f"Error processing sample queries: {e}")
 
     # Interactive mode
     print("\nInteractive mode - Ask about the weather in any city!")
@@ -97,6 +118,9 @@ async def run_sample_queries():
         except Exception as e:
             print(f"Error: {e}\n")
 
+    print(f"City extraction: {client.get_extraction_stats()}")
+    await client.aclose()
+
 
 async def main():
     """Run the demo: start server, wait for it to be ready, then run client."""
@@ -120,6 +144,7 @@ async def main():
         print("="*50)
 
         # Start the server in a subprocess
+        launched = time.perf_counter()
         server_process = subprocess.Popen(
             [sys.executable, "weather_server.py"],
             cwd=Path(__file__).parent,
@@ -130,8 +155,9 @@ async def main():
 
         print(f"Checking if server is ready at {server_url}...")
 
-        if await check_server_ready(f"{server_url}/mcp"):
-            print("Server is ready!")
+        if await check_server_ready(f"{server_url}/mcp", process=server_process):
+            print(
+                f"Server is ready! ({time.perf_counter() - launched:.2f}s after launch)")
             print(f"Server running at: {server_url}")
             print(f"MCP endpoint: {server_url}/mcp")
 
@@ -0,0 +1,113 @@
+"""A memo of LLM city extractions keyed by normalized query text."""
+
+import json
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+# Words that do not change which city a weather query is about
+STOPWORDS = {
+    "a", "about", "and", "any", "are", "at", "be", "can", "check", "current", "currently", "do",
+    "does", "for", "forecast", "get", "give", "hows", "how", "i", "in", "is", "it", "know",
+    "let", "like", "me", "my", "now", "of", "on", "outside", "please", "right", "show", "tell",
+    "temperature", "the", "there", "today", "weather", "what", "whats", "will", "you",
+}
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+|,")
+
+# Returned by get() when the query has not been seen (None, None is a valid cached failure)
+MISS = object()
+
+
+def normalize_extraction_query(query: str) -> str:
+    """
+    Fold a query to the words that name the place, so "weather in London?" and
+    "What's the weather in london" share a key. Word order is kept ("Paris, TX" is not "TX Paris").
+    """
+    decomposed = unicodedata.normalize("NFKD", query)
+    text = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    # Apostrophes are dropped inside words, so "what's" becomes the stopword "whats"
+    text = text.replace("'", "").replace("’", "")
+    words = _WORD_PATTERN.findall(text)
+    # A word right after a comma is a qualifier ("Smalltown, IN", "Portland, ME"), never a stopword
+    return " ".join(word for i, word in enumerate(words)
+                    if word != "," and (word not in STOPWORDS or (i > 0 and words[i - 1] == ",")))
+
+
+class ExtractionCache:
+    """
+    An LRU of (city, country_code) results for normalized queries.
+
+    Successful extractions are kept until evicted by `max_entries`. Failed extractions
+    (no city found, or the model call failed) are cached for `negative_ttl_seconds` only, so a
+    transient error is retried soon. With `path` set, successful entries are loaded at startup
+    and written back by `save()`.
+    """
+
+    def __init__(self, max_entries: int = 1024, negative_ttl_seconds: float = 60, path: Union[str, Path, None] = None):
+        self.max_entries = max_entries
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.path = Path(path) if path else None
+        # key -> (city, country_code, stored_at)
+        self._entries: "OrderedDict[str, Tuple[Optional[str], Optional[str], float]]" = OrderedDict()
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0}
+        self._dirty = False
+        if self.path is not None:
+            self._load()
+
+    def get(self, key: str) -> Any:
+        """Return the cached (city, country_code) for `key`, or MISS."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            city, country_code, stored_at = entry
+            if city is not None:
+                self._stats["hits"] += 1
+                self._entries.move_to_end(key)
+                return city, country_code
+            if time.time() - stored_at < self.negative_ttl_seconds:
+                self._stats["negative_hits"] += 1
+                return None, None
+            del self._entries[key]
+        self._stats["misses"] += 1
+        return MISS
+
+    def put(self, key: str, city: Optional[str], country_code: Optional[str]):
+        self._entries[key] = (city, country_code, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        if city is not None:
+            self._dirty = True
+
+    def save(self):
+        """Write the successful entries to `path`, if set and anything changed."""
+        if self.path is None or not self._dirty:
+            return
+        entries = {key: [city, country_code]
+                   for key, (city, country_code, _) in self._entries.items() if city is not None}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(entries, file, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+        self._dirty = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "entries": len(self._entries)}
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                entries = json.load(file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable city extraction cache {self.path}: {e}")
+            return
+        stored_at = time.time()
+        for key, (city, country_code) in list(entries.items())[-self.max_entries:]:
+            self._entries[key] = (city, country_code, stored_at)
@@ -0,0 +1,91 @@
+"""A local stand-in for the OpenWeatherMap current weather API, for benchmarks and load tests.
+
+Usage:
+    uvicorn fake_upstream:app --port 9000
+
+Then point the server at it with OPENWEATHER_BASE_URL=http://127.0.0.1:9000/data/2.5.
+Every city exists; "notfound" returns a 404. `/group` returns every city ID below 10,000,000.
+Set FAKE_UPSTREAM_LATENCY_MS to simulate the upstream's response time, and
+FAKE_UPSTREAM_ERROR_RATE (0 to 1) to answer that share of requests with a 503.
+"""
+
+import asyncio
+import os
+import random
+import zlib
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+LATENCY_SECONDS = float(os.getenv("FAKE_UPSTREAM_LATENCY_MS", "20")) / 1000
+ERROR_RATE = float(os.getenv("FAKE_UPSTREAM_ERROR_RATE", "0"))
+
+UNAVAILABLE = {"cod": 503, "message": "Service temporarily unavailable"}
+
+
+def fake_weather(query: str) -> dict:
+    """Return a deterministic OpenWeatherMap-shaped payload for a "City" or "City,CC" query."""
+    city, _, country_code = query.partition(",")
+    seed = zlib.crc32(query.lower().encode("utf-8"))
+    temperature = round(-10 + seed % 4000 / 100, 2)
+    return {
+        "coord": {"lon": round(seed % 36000 / 100 - 180, 4), "lat": round(seed % 18000 / 100 - 90, 4)},
+        "weather": [{"id": 800, "main": "Clear", "description": "clear sky", "icon": "01d"}],
+        "base": "stations",
+        "main": {
+            "temp": temperature,
+            "feels_like": round(temperature - 1.5, 2),
+            "temp_min": round(temperature - 2, 2),
+            "temp_max": round(temperature + 2, 2),
+            "pressure": 1000 + seed % 30,
+            "humidity": seed % 100,
+        },
+        "visibility": 10000,
+        "wind": {"speed": seed % 150 / 10, "deg": seed % 360},
+        "clouds": {"all": seed % 100},
+        "dt": 1700000000,
+        "sys": {"country": (country_code.strip() or "US").upper()},
+        "id": seed % 10000000,
+        "name": city.strip().title(),
+        "cod": 200,
+    }
+
+
+async def current_weather(request: Request) -> JSONResponse:
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        return JSONResponse(UNAVAILABLE, status_code=503)
+    query = request.query_params.get("q", "")
+    if not request.query_params.get("appid"):
+        return JSONResponse({"cod": 401, "message": "Invalid API key."}, status_code=401)
+    if not query or query.partition(",")[0].strip().lower() == "notfound":
+        return JSONResponse({"cod": "404", "message": "city not found"}, status_code=404)
+    return JSONResponse(fake_weather(query))
+
+
+async def group_weather(request: Request) -> JSONResponse:
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        return JSONResponse(UNAVAILABLE, status_code=503)
+    if not request.query_params.get("appid"):
+        return JSONResponse({"cod": 401, "message": "Invalid API key."}, status_code=401)
+    ids = [int(city_id) for city_id in request.query_params.get("id", "").split(",") if city_id]
+    if not ids or len(ids) > 20:
+        return JSONResponse({"cod": "400", "message": "Invalid ID list"}, status_code=400)
+    items = []
+    for city_id in ids:
+        if city_id < 10000000:
+            weather = fake_weather(f"City{city_id}")
+            weather["id"] = city_id
+            items.append(weather)
+    return JSONResponse({"cnt": len(items), "list": items})
+
+
+app = Starlette(routes=[
+    Route("/data/2.5/weather", current_weather),
+    Route("/data/2.5/group", group_weather),
+])
@@ -0,0 +1,170 @@
+"""Load-test the weather MCP server with 1..N worker processes against a local stand-in upstream.
+
+Usage:
+    python load_test.py [--workers 1,2,4] [--duration 10] [--concurrency 64] [--clients 2]
+
+For each worker count, this starts fake_upstream.py and serve.py (SQLite cache shared by the
+workers), then posts stateless JSON-RPC `tools/call` requests for `get_weather` straight to
+/mcp/ from several client processes and reports throughput and latency. Most lookups are cache
+hits, so the run measures the server's own request handling, which is what extra workers
+spread across cores. The load generator runs on the same host, so leave it some cores.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+HERE = Path(__file__).parent
+ACCEPT = "application/json, text/event-stream"
+
+
+def _tool_call(request_id: int, city: str) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+            "params": {"name": "get_weather", "arguments": {"city": city}}}
+
+
+async def _client(url: str, duration: float, concurrency: int, cities: int, seed: int):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency,
+                          max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30, headers={"Accept": ACCEPT}) as client:
+        async def worker(worker_id: int):
+            nonlocal errors
+            i = worker_id
+            while time.perf_counter() < deadline:
+                i += concurrency
+                start = time.perf_counter()
+                try:
+                    response = await client.post(url, json=_tool_call(i, f"City{(seed + i) % cities}"))
+                    if response.status_code != 200 or '"isError":true' in response.text:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies, errors
+
+
+def _run_client(args):
+    return asyncio.run(_client(*args))
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(
+                f"Process exited with code {process.returncode}")
+        try:
+            response = httpx.post(url, json={"jsonrpc": "2.0", "id": 0, "method": "tools/list"},
+                                  headers={"Accept": ACCEPT}, timeout=1)
+            if response.status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+def run(workers: int, args, upstream_url: str) -> dict:
+    port = args.port
+    url = f"http://127.0.0.1:{port}/mcp/"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        env = {
+            **os.environ,
+            "OPENWEATHER_API_KEY": os.getenv("OPENWEATHER_API_KEY") or "load-test",
+            "OPENWEATHER_BASE_URL": upstream_url,
+            "WEATHER_CACHE_BACKEND": "sqlite",
+            "WEATHER_CACHE_SQLITE_PATH": str(Path(temp_dir) / "cache.sqlite3"),
+            "WEATHER_CACHE_TTL_SECONDS": "3600",
+            "OPENWEATHER_RATE_LIMIT_PER_MINUTE": "0",
+        }
+        server = subprocess.Popen(
+            [sys.executable, "serve.py", "--workers",
+                str(workers), "--port", str(port)],
+            cwd=HERE, env=env, stdout=subprocess.DEVNULL)
+        try:
+            _wait_ready(url, server)
+            # Give every worker time to finish starting before measuring
+            time.sleep(1 + workers * 0.5)
+
+            per_client = max(1, args.concurrency // args.clients)
+            with multiprocessing.Pool(args.clients) as pool:
+                start = time.perf_counter()
+                results = pool.map(_run_client, [(url, args.duration, per_client, args.cities, seed * 7919)
+                                                 for seed in range(args.clients)])
+                elapsed = time.perf_counter() - start
+        finally:
+            server.terminate()
+            server.wait(timeout=15)
+
+    latencies = sorted(latency for client_latencies,
+                       _ in results for latency in client_latencies)
+    errors = sum(client_errors for _, client_errors in results)
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4",
+                        help="Comma-separated worker counts to compare.")
+    parser.add_argument("--duration", type=float, default=10,
+                        help="Seconds of load per worker count.")
+    parser.add_argument("--concurrency", type=int, default=64,
+                        help="Requests in flight across all clients.")
+    parser.add_argument("--clients", type=int, default=2,
+                        help="Load generator processes.")
+    parser.add_argument("--cities", type=int, default=200,
+                        help="Distinct cities requested.")
+    parser.add_argument("--latency-ms", type=float, default=20,
+                        help="Simulated upstream response time.")
+    parser.add_argument("--port", type=int, default=8100,
+                        help="The port for the server under test.")
+    parser.add_argument("--upstream-port", type=int, default=9100,
+                        help="The port for the stand-in upstream.")
+    args = parser.parse_args()
+
+    upstream_url = f"http://127.0.0.1:{args.upstream_port}/data/2.5"
+    upstream = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "fake_upstream:app",
+         "--port", str(args.upstream_port), "--log-level", "warning"],
+        cwd=HERE, env={**os.environ, "FAKE_UPSTREAM_LATENCY_MS": str(args.latency_ms)})
+    try:
+        time.sleep(1)
+        print(f"{os.cpu_count()} CPUs, {args.concurrency} requests in flight, "
+              f"{args.cities} cities, {args.duration:g}s per run\n")
+        print(f"{'workers':>7} {'req/s':>9} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        baseline = None
+        for workers in (int(value) for value in args.workers.split(",")):
+            result = run(workers, args, upstream_url)
+            baseline = baseline or result["rps"]
+            print(f"{result['workers']:>7} {result['rps']:>9.1f} {result['rps'] / baseline:>7.2f}x "
+                  f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['errors']:>7}")
+    finally:
+        upstream.terminate()
+        upstream.wait(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""A long-lived MCP client session shared by concurrent weather queries."""
+
+import asyncio
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+import anyio
+import httpx
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, CallToolResult, ListToolsResult
+
+# The error code the streamable HTTP transport reports when the server has dropped the session
+SESSION_TERMINATED = 32600
+
+
+def is_connection_error(error: Exception) -> bool:
+    """Whether `error` means the session can no longer be used, so a new one may succeed."""
+    if isinstance(error, McpError):
+        return error.error.code in (CONNECTION_CLOSED, SESSION_TERMINATED)
+    return isinstance(error, (anyio.ClosedResourceError, anyio.BrokenResourceError, httpx.TransportError))
+
+
+class MCPSessionManager:
+    """
+    Keeps one initialized `ClientSession` to an MCP server open across calls.
+
+    - The session is opened on first use, so the initialize handshake happens once instead of
+      once per query.
+    - The transport and session live in a background task: their anyio cancel scopes must be
+      entered and exited in the same task, while callers come from many tasks.
+    - Concurrent calls share the session; MCP matches responses to requests by ID.
+    - A call that fails because of the connection (closed or broken streams, transport errors,
+      a terminated session) closes the session and is retried once on a new one. Later calls
+      keep using the new session. Other errors are raised as is and keep the session open.
+    """
+
+    def __init__(self, url: str, connect_timeout_seconds: float = 10, call_timeout_seconds: float = 30):
+        self.url = url
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self.call_timeout = timedelta(seconds=call_timeout_seconds)
+        self.connects = 0
+        self._session: Optional[ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def get_session(self) -> ClientSession:
+        """Return the open session, connecting (or reconnecting) if there is none."""
+        session = self._session
+        if session is not None:
+            return session
+        async with self._lock:
+            if self._session is None:
+                await self._connect()
+            return self._session
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> CallToolResult:
+        """Call a tool on the shared session, reconnecting once if the session has failed."""
+        return await self._with_retry(
+            lambda session: session.call_tool(name, arguments, read_timeout_seconds=self.call_timeout))
+
+    async def list_tools(self) -> ListToolsResult:
+        return await self._with_retry(lambda session: session.list_tools())
+
+    async def aclose(self):
+        """Close the session and stop its background task."""
+        async with self._lock:
+            await self._disconnect()
+
+    async def _with_retry(self, request):
+        session = await self.get_session()
+        try:
+            return await request(session)
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            await self._invalidate(session)
+            return await request(await self.get_session())
+
+    async def _connect(self):
+        ready = asyncio.get_running_loop().create_future()
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._run(ready, self._stop))
+        try:
+            self._session = await asyncio.wait_for(asyncio.shield(ready), self.connect_timeout_seconds)
+        except BaseException:
+            await self._disconnect()
+            raise
+        self.connects += 1
+
+    async def _run(self, ready: asyncio.Future, stop: asyncio.Event):
+        session = None
+        try:
+            async with streamablehttp_client(self.url) as (read_stream, write_stream, _):
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    ready.set_result(session)
+                    await stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+        finally:
+            if not ready.done():
+                ready.cancel()
+            if session is not None and self._session is session:
+                self._session = None
+
+    async def _invalidate(self, session: ClientSession):
+        async with self._lock:
+            if self._session is session:
+                await self._disconnect()
+
+    async def _disconnect(self):
+        self._session = None
+        if self._stop is not None:
+            self._stop.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, self.connect_timeout_seconds)
+            except asyncio.TimeoutError:
+                pass
+        self._task = None
+        self._stop = None
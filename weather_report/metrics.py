@@ -0,0 +1,165 @@
+"""Minimal Prometheus-style metrics (counters, gauges, histograms) rendered in the text exposition format."""
+
+import bisect
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Seconds; covers cache hits (sub-millisecond) through slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}",
+                *self._samples()]
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class _Value(_Metric):
+    """
+    Base for counters and gauges. With `callback`, values are read at scrape time instead: it
+    returns a number (no labels) or a dict of label value tuples to numbers.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Union[float, Dict[LabelValues, float]]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        values = self._values
+        if self._callback is not None:
+            values = self._callback()
+            if not isinstance(values, dict):
+                values = {(): values}
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(_Value):
+    type_name = "counter"
+
+
+class Gauge(_Value):
+    """A value that goes up and down."""
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts with a final +Inf bucket, sum)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts, total = self._values.setdefault(
+            key, ([0] * (len(self.buckets) + 1), [0.0]))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def _samples(self):
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames, key, ("le", _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total[0])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    """Holds the metrics of one process and renders them for a /metrics scrape."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                callback: Optional[Callable[[], Union[float, Dict[LabelValues, float]]]] = None) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, callback))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback: Optional[Callable[[], Union[float, Dict[LabelValues, float]]]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+@contextmanager
+def track(calls: Counter, duration: Histogram, in_flight: Gauge, **labels):
+    """
+    Time a block: counts it in `calls` with an extra `outcome` label ("ok" or "error"),
+    observes its duration and holds `in_flight` up while it runs.
+    """
+    in_flight.inc(**labels)
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        duration.observe(time.perf_counter() - start, **labels)
+        calls.inc(outcome=outcome, **labels)
+        in_flight.dec(**labels)
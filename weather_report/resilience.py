@@ -0,0 +1,101 @@
+"""Upstream protection for the weather server: a token-bucket rate limiter and a circuit breaker."""
+
+import asyncio
+import time
+from typing import Optional
+
+
+class UpstreamUnavailableError(ValueError):
+    """The upstream API could not answer (rate limited, failing or unreachable). Cached data may still be served."""
+
+
+class RateLimitExceededError(UpstreamUnavailableError):
+    pass
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    pass
+
+
+class TokenBucket:
+    """
+    Allows `rate_per_second` calls on average with bursts of up to `capacity`.
+
+    `acquire` waits for a token, but only up to `max_wait_seconds`: a caller that would wait
+    longer is rejected at once with RateLimitExceededError, so a burst degrades into fast
+    failures (or stale cache hits) instead of an ever-growing queue.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float, max_wait_seconds: float = 2.0):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self.max_wait_seconds = max_wait_seconds
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+
+    async def acquire(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens +
+                           (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+
+        # Tokens may go negative: each waiting caller reserves its token now and sleeps until
+        # the bucket has refilled past it, so waiters are served in order without a lock
+        wait_seconds = (1 - self._tokens) / self.rate_per_second
+        if wait_seconds > self.max_wait_seconds:
+            raise RateLimitExceededError(
+                "Too many weather requests right now, please try again shortly")
+        self._tokens -= 1
+        if wait_seconds > 0:
+            await asyncio.sleep(wait_seconds)
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing upstream for a while.
+
+    - closed: calls go through; `failure_threshold` failures in a row open the circuit.
+    - open: calls are rejected with CircuitOpenError for `reset_timeout_seconds`.
+    - half-open: one trial call goes through; success closes the circuit, failure reopens it.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_seconds: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout_seconds:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now."""
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._trial_running):
+            raise CircuitOpenError(
+                "Weather service is temporarily unavailable, please try again shortly")
+        if state == self.HALF_OPEN:
+            self._trial_running = True
+
+    def record_success(self):
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    def release(self):
+        """Give back a half-open trial that never reached the upstream."""
+        self._trial_running = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self._trial_running or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        self._trial_running = False
@@ -0,0 +1,54 @@
+"""Production launcher: run the stateless weather MCP server in several uvicorn worker processes.
+
+Usage:
+    python serve.py [--workers N] [--host HOST] [--port PORT]
+
+The server keeps no MCP session state (stateless_http=True), so any worker can answer any
+request. With more than one worker, the weather cache defaults to the SQLite backend so a city
+fetched by one worker is a cache hit for the others. Each worker opens its own upstream client.
+
+The same app runs under gunicorn with:
+    gunicorn -w 4 -k uvicorn.workers.UvicornWorker "weather_server:create_app()"
+(set WEATHER_CACHE_BACKEND=sqlite in the environment).
+"""
+
+import argparse
+import os
+
+import uvicorn
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the weather MCP server with multiple worker processes.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="The number of worker processes (default: one per CPU).")
+    parser.add_argument("--host", default=os.getenv("WEATHER_SERVER_HOST", "127.0.0.1"),
+                        help="The interface to listen on.")
+    parser.add_argument("--port", type=int, default=int(os.getenv("WEATHER_SERVER_PORT", "8000")),
+                        help="The port to listen on.")
+    parser.add_argument("--log-level", default="warning",
+                        help="The uvicorn and MCP server log level.")
+    args = parser.parse_args()
+
+    # Workers import weather_server themselves, so these settings reach them via the environment
+    if args.workers > 1:
+        os.environ.setdefault("WEATHER_CACHE_BACKEND", "sqlite")
+    # FastMCP logs every request at INFO, which costs real throughput under load
+    os.environ.setdefault("WEATHER_SERVER_LOG_LEVEL", args.log_level.upper())
+    print(f"Starting {args.workers} worker(s) on http://{args.host}:{args.port}/mcp/ "
+          f"with the {os.getenv('WEATHER_CACHE_BACKEND', 'memory')} cache")
+
+    uvicorn.run(
+        "weather_server:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+    )
+
+
+if __name__ == "__main__":
+    main()
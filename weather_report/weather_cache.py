@@ -0,0 +1,320 @@
+"""TTL cache with request coalescing for the weather MCP server, with in-memory and SQLite storage
+and tracking of the most requested keys."""
+
+import asyncio
+import heapq
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+
+def normalize_query(city: str, country_code: str = "") -> Tuple[str, str]:
+    """Return the cache key for a city query, ignoring case and extra whitespace."""
+    return " ".join(city.split()).lower(), country_code.strip().lower()
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    stored_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+
+class MemoryCacheBackend:
+    """Entries in this process only, evicting the least recently used beyond `max_entries`."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Any, CacheEntry]" = OrderedDict()
+
+    def get(self, key: Any) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: Any, entry: CacheEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def try_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        """Only this process uses the entries, so it always holds every lease."""
+        return True
+
+
+class SQLiteCacheBackend:
+    """
+    Entries in a SQLite file shared by every worker process on the host, so one worker's
+    upstream fetch is a hit for the others.
+
+    Keys and values are stored as JSON. The database runs in WAL mode so readers do not block
+    the writer; lookups are single-row primary key reads, fast enough to run on the event loop.
+    Beyond `max_entries`, the oldest entries are deleted (checked every `evict_every` writes).
+    """
+
+    def __init__(self, path: Union[str, Path], max_entries: int = 1024, evict_every: int = 64):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._writes = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False, timeout=5)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS weather_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)")
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS weather_cache_stored_at ON weather_cache (stored_at)")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS weather_cache_leases ("
+            "name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    def get(self, key: Any) -> Optional[CacheEntry]:
+        row = self._connection.execute(
+            "SELECT value, stored_at FROM weather_cache WHERE key = ?", (json.dumps(key),)).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(value=json.loads(row[0]), stored_at=row[1])
+
+    def set(self, key: Any, entry: CacheEntry):
+        self._connection.execute(
+            "INSERT OR REPLACE INTO weather_cache (key, value, stored_at) VALUES (?, ?, ?)",
+            (json.dumps(key), json.dumps(entry.value), entry.stored_at))
+        self._writes += 1
+        if self._writes % self.evict_every == 0:
+            self._connection.execute(
+                "DELETE FROM weather_cache WHERE key NOT IN ("
+                "SELECT key FROM weather_cache ORDER BY stored_at DESC LIMIT ?)", (self.max_entries,))
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM weather_cache").fetchone()[0]
+
+    def try_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        """
+        Take or renew the lease `name` for `ttl_seconds`, so one worker process does a job for
+        all of them. Returns True if `holder` now holds it; an expired lease can be taken over.
+        """
+        now = time.time()
+        self._connection.execute(
+            "INSERT INTO weather_cache_leases (name, holder, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+            "WHERE weather_cache_leases.holder = excluded.holder OR weather_cache_leases.expires_at < ?",
+            (name, holder, now + ttl_seconds, now))
+        row = self._connection.execute(
+            "SELECT holder FROM weather_cache_leases WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] == holder
+
+    def close(self):
+        self._connection.close()
+
+
+class HotKeyTracker:
+    """
+    Counts requests per cache key so the most requested ones can be refreshed ahead of expiry.
+
+    Each key keeps a score (+1 per request) and the data needed to fetch it again. `decay`
+    scales every score down so the ranking follows recent traffic; keys whose score falls
+    below `min_score` are dropped, and at most `max_keys` are kept.
+    """
+
+    def __init__(self, max_keys: int = 1024, min_score: float = 0.5):
+        self.max_keys = max_keys
+        self.min_score = min_score
+        self._scores: Dict[Any, float] = {}
+        self._requests: Dict[Any, Any] = {}
+
+    def record(self, key: Any, request: Any):
+        self._scores[key] = self._scores.get(key, 0) + 1
+        self._requests[key] = request
+        if len(self._scores) > 2 * self.max_keys:
+            self._prune()
+
+    def hottest(self, count: int) -> List[Tuple[Any, Any]]:
+        """Return up to `count` (key, request) pairs, most requested first."""
+        keys = heapq.nlargest(count, self._scores, key=self._scores.__getitem__)
+        return [(key, self._requests[key]) for key in keys]
+
+    def decay(self, factor: float = 0.5):
+        for key in self._scores:
+            self._scores[key] *= factor
+        self._prune()
+
+    def _prune(self):
+        keep = heapq.nlargest(self.max_keys, ((score, key) for key, score in self._scores.items()
+                                              if score >= self.min_score), key=lambda item: item[0])
+        self._scores = {key: score for score, key in keep}
+        self._requests = {key: self._requests[key] for key in self._scores}
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+class SQLiteHotKeyTracker:
+    """
+    A HotKeyTracker whose counts live in the database of a `SQLiteCacheBackend`, so every worker
+    process records into (and the cache warmer ranks) the requests of all of them.
+
+    `decay` affects every worker's counts, so call it from one process only (the lease holder).
+    """
+
+    def __init__(self, backend: SQLiteCacheBackend, max_keys: int = 1024, min_score: float = 0.5):
+        self.max_keys = max_keys
+        self.min_score = min_score
+        self._connection = backend._connection
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS weather_cache_hot_keys ("
+            "key TEXT PRIMARY KEY, request TEXT NOT NULL, score REAL NOT NULL)")
+
+    def record(self, key: Any, request: Any):
+        self._connection.execute(
+            "INSERT INTO weather_cache_hot_keys (key, request, score) VALUES (?, ?, 1) "
+            "ON CONFLICT (key) DO UPDATE SET request = excluded.request, score = score + 1",
+            (json.dumps(key), json.dumps(request)))
+
+    def hottest(self, count: int) -> List[Tuple[Any, Any]]:
+        """Return up to `count` (key, request) pairs, most requested first."""
+        rows = self._connection.execute(
+            "SELECT key, request FROM weather_cache_hot_keys ORDER BY score DESC LIMIT ?", (count,))
+        # JSON turns tuple keys into lists; cache keys must stay hashable
+        return [(_from_json_key(key), json.loads(request)) for key, request in rows]
+
+    def decay(self, factor: float = 0.5):
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.execute(
+                "UPDATE weather_cache_hot_keys SET score = score * ?", (factor,))
+            self._connection.execute(
+                "DELETE FROM weather_cache_hot_keys WHERE score < ? OR key NOT IN ("
+                "SELECT key FROM weather_cache_hot_keys ORDER BY score DESC LIMIT ?)",
+                (self.min_score, self.max_keys))
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM weather_cache_hot_keys").fetchone()[0]
+
+
+def _from_json_key(key: str) -> Any:
+    value = json.loads(key)
+    return tuple(value) if isinstance(value, list) else value
+
+
+class WeatherCache:
+    """
+    A TTL cache for upstream weather lookups.
+
+    - Entries younger than `ttl_seconds` are served directly (a hit).
+    - With `stale_seconds` > 0, entries up to `ttl_seconds + stale_seconds` old are served
+      immediately while one background refresh updates them (stale-while-revalidate).
+    - Concurrent misses for the same key share a single upstream call (single-flight).
+    - Expired entries are kept until evicted by `max_entries` (least recently used first), so
+      callers can still `peek` at the last known value.
+    - Entries live in `backend`: in memory by default, or a `SQLiteCacheBackend` shared by
+      several worker processes. Single-flight always works within one process.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, stale_seconds: float = 0, max_entries: int = 1024,
+                 backend: Union[MemoryCacheBackend, SQLiteCacheBackend, None] = None):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._backend = backend if backend is not None else MemoryCacheBackend(
+            max_entries)
+        self._inflight: Dict[Any, asyncio.Task] = {}
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0,
+                       "coalesced": 0, "refreshes": 0, "upstream_errors": 0}
+
+    async def get_or_fetch(self, key: Any, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for `key`, calling `fetch` only when it is missing or expired."""
+        entry = self._backend.get(key)
+        if entry is not None:
+            age = entry.age
+            if age < self.ttl_seconds:
+                self._stats["hits"] += 1
+                return entry.value
+            if age < self.ttl_seconds + self.stale_seconds:
+                self._stats["stale_hits"] += 1
+                self.refresh(key, fetch)
+                return entry.value
+
+        self._stats["misses"] += 1
+        return await self._single_flight(key, fetch)
+
+    def refresh(self, key: Any, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Start a background refresh of `key` unless one is already running."""
+        if key not in self._inflight:
+            self._stats["refreshes"] += 1
+        task = self._start_fetch(key, fetch)
+        # Errors are counted in _fetch_and_store; the stale value stays in place
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    def get(self, key: Any) -> Optional[Any]:
+        """Return the value for `key` if it is fresh, counting a hit or miss. Never fetches."""
+        entry = self._backend.get(key)
+        if entry is not None and entry.age < self.ttl_seconds:
+            self._stats["hits"] += 1
+            return entry.value
+        self._stats["misses"] += 1
+        return None
+
+    def peek(self, key: Any) -> Optional[CacheEntry]:
+        """Return the entry for `key` regardless of its age, without counting a hit or miss."""
+        return self._backend.get(key)
+
+    def set(self, key: Any, value: Any):
+        self._backend.set(key, CacheEntry(value=value, stored_at=time.time()))
+
+    def try_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        """Take or renew a lease shared by every process using the same backend (see SQLiteCacheBackend)."""
+        return self._backend.try_lease(name, holder, ttl_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + \
+            self._stats["stale_hits"] + self._stats["misses"]
+        served = self._stats["hits"] + self._stats["stale_hits"]
+        return {
+            **self._stats,
+            "entries": len(self._backend),
+            "inflight": len(self._inflight),
+            "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+            "ttl_seconds": self.ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "max_entries": self.max_entries,
+            "backend": type(self._backend).__name__,
+        }
+
+    async def _single_flight(self, key: Any, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        if key in self._inflight:
+            self._stats["coalesced"] += 1
+        # shield() keeps one caller's cancellation from cancelling the fetch shared by the others
+        return await asyncio.shield(self._start_fetch(key, fetch))
+
+    def _start_fetch(self, key: Any, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_store(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _fetch_and_store(self, key: Any, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fetch()
+        except Exception:
+            self._stats["upstream_errors"] += 1
+            raise
+        self.set(key, value)
+        return value
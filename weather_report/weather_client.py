@@ -4,17 +4,39 @@ import asyncio
 import json
 import os
 import re
-from typing import Any, Dict, Optional, Tuple
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 from openai import AsyncAzureOpenAI
-from mcp.client.streamable_http import streamablehttp_client
-from mcp import ClientSession
+
+from city_extractor import CityExtractor
+from extraction_cache import MISS, ExtractionCache, normalize_extraction_query
+from mcp_session import MCPSessionManager
 
 load_dotenv()
 
+MCP_SERVER_URL = "http://127.0.0.1:8000/mcp/"
+# The only get_weather fields format_weather_response reads, requested in the compact (flat) format
+WEATHER_FIELDS = ["city", "temperature.current", "weather.description"]
+
+
+@dataclass
+class WeatherQueryResult:
+    query: str
+    response: str
+    city: Optional[str] = None
+    country_code: Optional[str] = None
+    extract_seconds: float = 0.0
+    # Time waiting for the weather, including when another query's identical fetch was shared
+    fetch_seconds: float = 0.0
+    total_seconds: float = 0.0
+    # True when the weather came from a fetch started for an earlier query in the batch
+    shared_fetch: bool = False
+
 
 class WeatherMCPClient:
-    def __init__(self):
+    def __init__(self, mcp_session: Optional[MCPSessionManager] = None):
         # Initialize Azure OpenAI client
         self.azure_client = AsyncAzureOpenAI(
             api_key=os.getenv("AZURE_OPENAI_API_KEY"),
@@ -23,9 +45,81 @@ class WeatherMCPClient:
             azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
         )
         self.deployment_name = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
-        self.mcp_server_url = "http://127.0.0.1:8000/mcp/"
+        self.mcp_server_url = MCP_SERVER_URL
+        # One initialized MCP session, shared by every query this client makes
+        self._owns_mcp_session = mcp_session is None
+        self.mcp_session = mcp_session or MCPSessionManager(
+            self.mcp_server_url)
+        # Most queries name a well-known city, which the local gazetteer finds without a model call
+        self.city_extractor = CityExtractor()
+        # Model answers for queries the gazetteer could not resolve, keyed by normalized query
+        self.extraction_cache = ExtractionCache(
+            max_entries=int(os.getenv("CITY_CACHE_MAX_ENTRIES", "1024")),
+            negative_ttl_seconds=float(
+                os.getenv("CITY_CACHE_NEGATIVE_TTL_SECONDS", "60")),
+            path=os.getenv("CITY_CACHE_PATH") or None,
+        )
+        self._extraction_stats = {"local": 0, "cached": 0, "llm": 0,
+                                  "local_seconds": 0.0, "llm_seconds": 0.0}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the MCP session if this client opened it and the Azure OpenAI client, and persist the extraction cache."""
+        self.extraction_cache.save()
+        if self._owns_mcp_session:
+            await self.mcp_session.aclose()
+        await self.azure_client.close()
 
     async def extract_city_from_query(self, query: str) -> Tuple[Optional[str], Optional[str]]:
+        """Extract city and country from a natural language query, asking Azure OpenAI only when the local rules are unsure."""
+        start = time.perf_counter()
+        match = self.city_extractor.extract(query)
+        if match is not None and match.confident:
+            self._extraction_stats["local"] += 1
+            self._extraction_stats["local_seconds"] += time.perf_counter() - start
+            return match.city, match.country_code
+
+        cache_key = normalize_extraction_query(query)
+        cached = self.extraction_cache.get(cache_key)
+        if cached is not MISS:
+            self._extraction_stats["cached"] += 1
+            return cached
+
+        start = time.perf_counter()
+        city, country_code = await self.extract_city_with_llm(query)
+        self._extraction_stats["llm"] += 1
+        self._extraction_stats["llm_seconds"] += time.perf_counter() - start
+        # A failure (no city, or the call failed) is cached briefly so it is retried soon
+        self.extraction_cache.put(cache_key, city, country_code)
+        return city, country_code
+
+    def get_extraction_stats(self) -> Dict[str, Any]:
+        """Report how often the local extractor or the cache answered and the model latency that saved."""
+        stats = self._extraction_stats
+        total = stats["local"] + stats["cached"] + stats["llm"]
+        avg_local_ms = stats["local_seconds"] / \
+            stats["local"] * 1000 if stats["local"] else 0.0
+        avg_llm_ms = stats["llm_seconds"] / \
+            stats["llm"] * 1000 if stats["llm"] else None
+        return {
+            "queries": total,
+            "local": stats["local"],
+            "cached": stats["cached"],
+            "llm": stats["llm"],
+            "local_ratio": round(stats["local"] / total, 4) if total else 0.0,
+            "avg_local_ms": round(avg_local_ms, 3),
+            "avg_llm_ms": round(avg_llm_ms, 1) if avg_llm_ms is not None else None,
+            # Estimated from the average model call; unknown until at least one query used it
+            "estimated_saved_seconds": round((stats["local"] + stats["cached"]) * (avg_llm_ms - avg_local_ms) / 1000, 2)
+            if avg_llm_ms is not None else None,
+        }
+
+    async def extract_city_with_llm(self, query: str) -> Tuple[Optional[str], Optional[str]]:
         """Use Azure OpenAI to extract city and country from natural language query."""
         system_prompt = """You are a helpful assistant that extracts city and country information from weather queries.
         
@@ -68,29 +162,22 @@ class WeatherMCPClient:
     async def get_weather_from_mcp(self, city: str, country_code: str = "") -> Optional[Dict[str, Any]]:
         """Get weather data from MCP server."""
         try:
-            async with streamablehttp_client(self.mcp_server_url) as (
-                read_stream,
-                write_stream,
-                _,
-            ):
-                async with ClientSession(read_stream, write_stream) as session:
-                    # Initialize the connection
-                    await session.initialize()
-
-                    # Call the get_weather tool
-                    tool_result = await session.call_tool("get_weather", {
-                        "city": city,
-                        "country_code": country_code
-                    })
-
-                    # Parse the result
-                    if tool_result.content:
-                        for content in tool_result.content:
-                            if hasattr(content, 'text') and content.text:
-                                try:
-                                    return json.loads(content.text)
-                                except json.JSONDecodeError:
-                                    pass
+            # Call the get_weather tool on the shared session
+            tool_result = await self.mcp_session.call_tool("get_weather", {
+                "city": city,
+                "country_code": country_code,
+                "fields": WEATHER_FIELDS,
+                "compact": True,
+            })
+
+            # Parse the result
+            if tool_result.content:
+                for content in tool_result.content:
+                    if hasattr(content, 'text') and content.text:
+                        try:
+                            return json.loads(content.text)
+                        except json.JSONDecodeError:
+                            pass
 
         except Exception as e:
             print(f"Error getting weather from MCP: {e}")
@@ -111,14 +198,66 @@ class WeatherMCPClient:
 
         # Get weather data from MCP server
         weather_data = await self.get_weather_from_mcp(city, country_code or "")
-
+        return self.format_weather_response(city, weather_data)
+
+    async def process_weather_queries(self, queries: List[str], max_concurrency: int = 8) -> List[WeatherQueryResult]:
+        """
+        Process many natural language weather queries at once and return results in input order.
+
+        Extraction and fetching are pipelined: each query fetches its weather as soon as its city
+        is known, while other queries are still being extracted. At most `max_concurrency`
+        extractions and `max_concurrency` fetches run at a time. Queries with the same normalized
+        text share one extraction, and queries for the same city share one fetch.
+        """
+        extract_slots = asyncio.Semaphore(max_concurrency)
+        fetch_slots = asyncio.Semaphore(max_concurrency)
+        extractions: Dict[str, asyncio.Task] = {}
+        fetches: Dict[Tuple[str, str], asyncio.Task] = {}
+
+        async def extract(query: str):
+            async with extract_slots:
+                return await self.extract_city_from_query(query)
+
+        async def fetch(city: str, country_code: str):
+            async with fetch_slots:
+                return await self.get_weather_from_mcp(city, country_code)
+
+        async def process(query: str) -> WeatherQueryResult:
+            start = time.perf_counter()
+            key = normalize_extraction_query(query) or query
+            if key not in extractions:
+                extractions[key] = asyncio.create_task(extract(query))
+            city, country_code = await extractions[key]
+            extracted = time.perf_counter()
+            result = WeatherQueryResult(query=query, response="", city=city, country_code=country_code,
+                                        extract_seconds=extracted - start)
+
+            if not city:
+                result.response = "Sorry, I couldn't identify a city in your query."
+            else:
+                city_key = (city.casefold(), (country_code or "").casefold())
+                result.shared_fetch = city_key in fetches
+                if not result.shared_fetch:
+                    fetches[city_key] = asyncio.create_task(
+                        fetch(city, country_code or ""))
+                weather_data = await fetches[city_key]
+                result.fetch_seconds = time.perf_counter() - extracted
+                result.response = self.format_weather_response(
+                    city, weather_data)
+
+            result.total_seconds = time.perf_counter() - start
+            return result
+
+        return list(await asyncio.gather(*(process(query) for query in queries)))
+
+    def format_weather_response(self, city: str, weather_data: Optional[Dict[str, Any]]) -> str:
+        """Turn compact get_weather data (keyed by dotted field path) into a one-line answer."""
         if not weather_data:
             return f"Sorry, I couldn't get weather data for {city}."
 
         # Extract temperature and condition
-        temp_celsius = weather_data.get("temperature", {}).get("current")
-        condition = weather_data.get(
-            "weather", {}).get("description", "unknown")
+        temp_celsius = weather_data.get("temperature.current")
+        condition = weather_data.get("weather.description") or "unknown"
         actual_city = weather_data.get("city", city)
 
         if temp_celsius is None:
@@ -131,18 +270,14 @@ class WeatherMCPClient:
         return f"The weather in {actual_city} is {temp_fahrenheit:.1f}°F and {condition}."
 
 
-async def test_mcp_connection():
-    """Test if MCP server is available."""
+async def test_mcp_connection(mcp_session: Optional[MCPSessionManager] = None):
+    """Test if MCP server is available. Pass a session manager to reuse (and warm up) its session."""
+    if mcp_session is None:
+        async with MCPSessionManager(MCP_SERVER_URL) as mcp_session:
+            return await test_mcp_connection(mcp_session)
     try:
-        async with streamablehttp_client("http://127.0.0.1:8000/mcp/") as (
-            read_stream,
-            write_stream,
-            _,
-        ):
-            async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
-                tools_result = await session.list_tools()
-                return len(tools_result.tools) > 0
+        tools_result = await mcp_session.list_tools()
+        return len(tools_result.tools) > 0
     except Exception:
         return False
 
@@ -151,15 +286,21 @@ async def main():
     """Main function for direct client usage."""
     print("Starting Weather Demo...")
 
-    # Test MCP server connection
-    print("Checking MCP server connection...")
-    if not await test_mcp_connection():
-        print("Cannot connect to MCP server at http://127.0.0.1:8000/mcp/")
-        print("Please make sure the weather server is running:")
-        print("   python weather_server.py")
-        return
+    async with MCPSessionManager(MCP_SERVER_URL) as mcp_session:
+        # Test MCP server connection; the session it opens is reused for every query
+        print("Checking MCP server connection...")
+        if not await test_mcp_connection(mcp_session):
+            print(f"Cannot connect to MCP server at {MCP_SERVER_URL}")
+            print("Please make sure the weather server is running:")
+            print("   python weather_server.py")
+            return
+
+        print("MCP server is ready!")
+        await run_interactive(mcp_session)
 
-    print("MCP server is ready!")
+
+async def run_interactive(mcp_session: MCPSessionManager):
+    """Check the environment and answer weather queries typed by the user."""
 
     # Check if all required environment variables are set
     required_vars = [
@@ -177,7 +318,7 @@ async def main():
         print("\nPlease check your .env file and ensure all variables are set.")
         return
 
-    client = WeatherMCPClient()
+    client = WeatherMCPClient(mcp_session)
 
     # Interactive mode
     print("Interactive mode - Ask about the weather in any city!")
@@ -200,5 +341,9 @@ async def main():
         except Exception as e:
             print(f"Error: {e}\n")
 
+    print(f"City extraction: {client.get_extraction_stats()}")
+    await client.aclose()
+
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,13 +1,34 @@
 """Weather MCP Server - A stateless MCP server that provides weather information."""
 
+import asyncio
+import functools
+import logging
 import os
-from typing import Dict, Any, Optional
+import random
+import socket
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
 import httpx
+import uvicorn
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP, Context
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+
+from metrics import Registry, track
+from resilience import (CircuitBreaker, CircuitOpenError, RateLimitExceededError, TokenBucket,
+                        UpstreamUnavailableError)
+from weather_cache import (HotKeyTracker, MemoryCacheBackend, SQLiteCacheBackend, SQLiteHotKeyTracker,
+                           WeatherCache, normalize_query)
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Initialize the FastMCP server with stateless HTTP configuration
 server = FastMCP(
     name="Weather Server",
@@ -15,95 +36,433 @@ server = FastMCP(
     stateless_http=True,  # Enable stateless mode
     json_response=True,   # Return JSON responses
     streamable_http_path="/mcp/",  # Explicitly set with trailing slash
+    log_level=os.getenv("WEATHER_SERVER_LOG_LEVEL", "INFO").upper(),
 )
 
 
-@server.tool(
-    name="get_weather",
-    description="Get current weather information for a city using OpenWeatherMap API"
+# Upstream endpoint; override to point at a local stand-in for benchmarks and load tests
+OPENWEATHER_BASE_URL = os.getenv(
+    "OPENWEATHER_BASE_URL", "https://api.openweathermap.org/data/2.5").rstrip("/")
+
+# One pooled client for the server's lifetime, so tool calls reuse connections instead of
+# paying for DNS, TCP and TLS on every request. Created in the app lifespan (see create_app).
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Create the upstream HTTP client from the OPENWEATHER_* connection settings."""
+    http2 = os.getenv("OPENWEATHER_HTTP2", "true").lower() == "true"
+    if http2:
+        try:
+            import h2  # noqa: F401 - HTTP/2 support is optional (pip install httpx[http2])
+        except ImportError:
+            http2 = False
+
+    timeout = float(os.getenv("OPENWEATHER_TIMEOUT_SECONDS", "10"))
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=int(
+                os.getenv("OPENWEATHER_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(
+                os.getenv("OPENWEATHER_MAX_KEEPALIVE_CONNECTIONS", "20")),
+            keepalive_expiry=float(
+                os.getenv("OPENWEATHER_KEEPALIVE_EXPIRY_SECONDS", "30")),
+        ),
+        timeout=httpx.Timeout(
+            timeout,
+            connect=float(os.getenv("OPENWEATHER_CONNECT_TIMEOUT_SECONDS", "5")),
+        ),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared upstream client, creating it if the server lifespan has not."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = create_http_client()
+    return _http_client
+
+
+@asynccontextmanager
+async def http_client_lifespan():
+    """Open the shared upstream client at startup and close it on shutdown."""
+    global _http_client
+    _http_client = create_http_client()
+    try:
+        yield
+    finally:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# Bounds for get_weather_many: upstream lookups in flight per call, and cities per call
+WEATHER_MANY_MAX_CONCURRENCY = int(
+    os.getenv("WEATHER_MANY_MAX_CONCURRENCY", "8"))
+WEATHER_MANY_MAX_CITIES = int(os.getenv("WEATHER_MANY_MAX_CITIES", "50"))
+# OpenWeatherMap's /group endpoint accepts at most 20 city IDs per request
+GROUP_MAX_IDS = 20
+
+# Where the SQLite cache lives when WEATHER_CACHE_SQLITE_PATH is not set
+DEFAULT_CACHE_SQLITE_PATH = Path(__file__).parent / ".cache" / "weather_cache.sqlite3"
+
+
+def create_cache_backend():
+    """Pick the cache storage from WEATHER_CACHE_BACKEND: "memory" (default) or "sqlite" (shared by workers)."""
+    max_entries = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "1024"))
+    backend = os.getenv("WEATHER_CACHE_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteCacheBackend(
+            os.getenv("WEATHER_CACHE_SQLITE_PATH") or DEFAULT_CACHE_SQLITE_PATH, max_entries=max_entries)
+    if backend != "memory":
+        raise ValueError(
+            f"Unknown WEATHER_CACHE_BACKEND '{backend}', expected 'memory' or 'sqlite'")
+    return MemoryCacheBackend(max_entries)
+
+
+def create_hot_key_tracker(backend):
+    """Count requests in the SQLite database when workers share it, so the warming worker sees all their traffic."""
+    max_keys = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "1024"))
+    if isinstance(backend, SQLiteCacheBackend):
+        return SQLiteHotKeyTracker(backend, max_keys=max_keys)
+    return HotKeyTracker(max_keys=max_keys)
+
+
+# Current weather changes slowly, so repeated lookups for the same city are served from the cache
+cache_backend = create_cache_backend()
+weather_cache = WeatherCache(
+    ttl_seconds=float(os.getenv("WEATHER_CACHE_TTL_SECONDS", "300")),
+    stale_seconds=float(os.getenv("WEATHER_CACHE_STALE_SECONDS", "0")),
+    max_entries=int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "1024")),
+    backend=cache_backend,
+)
+
+# Cache warming: the most requested cities are refreshed in the background shortly before their
+# entries expire, so their lookups stay cache hits. Requests count with a half-life of one TTL.
+WEATHER_WARM_INTERVAL_SECONDS = float(
+    os.getenv("WEATHER_WARM_INTERVAL_SECONDS", "30"))
+WEATHER_WARM_TOP_N = int(os.getenv("WEATHER_WARM_TOP_N", "50"))
+WEATHER_WARM_AHEAD_SECONDS = float(
+    os.getenv("WEATHER_WARM_AHEAD_SECONDS", "60"))
+WEATHER_WARM_MAX_CONCURRENCY = int(
+    os.getenv("WEATHER_WARM_MAX_CONCURRENCY", "4"))
+hot_cities = create_hot_key_tracker(cache_backend)
+_cache_warmer: Optional[asyncio.Task] = None
+
+
+# Upstream protection. The limiter keeps bursts within the API plan (per worker process; 0
+# disables it), retries ride out brief 429/5xx responses, and the breaker stops calling an
+# upstream that keeps failing so lookups fall back to stale cached data at once.
+OPENWEATHER_RATE_LIMIT_PER_MINUTE = float(
+    os.getenv("OPENWEATHER_RATE_LIMIT_PER_MINUTE", "60"))
+upstream_rate_limiter = TokenBucket(
+    rate_per_second=OPENWEATHER_RATE_LIMIT_PER_MINUTE / 60,
+    capacity=float(os.getenv("OPENWEATHER_RATE_LIMIT_BURST", "10")),
+    max_wait_seconds=float(
+        os.getenv("OPENWEATHER_RATE_LIMIT_MAX_WAIT_SECONDS", "2")),
+) if OPENWEATHER_RATE_LIMIT_PER_MINUTE > 0 else None
+upstream_breaker = CircuitBreaker(
+    failure_threshold=int(
+        os.getenv("OPENWEATHER_CIRCUIT_FAILURE_THRESHOLD", "5")),
+    reset_timeout_seconds=float(
+        os.getenv("OPENWEATHER_CIRCUIT_RESET_SECONDS", "30")),
 )
-async def get_weather(city: str, country_code: str = "", ctx: Optional[Context] = None) -> Dict[str, Any]:
+OPENWEATHER_MAX_RETRIES = int(os.getenv("OPENWEATHER_MAX_RETRIES", "2"))
+OPENWEATHER_RETRY_BACKOFF_SECONDS = float(
+    os.getenv("OPENWEATHER_RETRY_BACKOFF_SECONDS", "0.5"))
+OPENWEATHER_RETRY_MAX_BACKOFF_SECONDS = float(
+    os.getenv("OPENWEATHER_RETRY_MAX_BACKOFF_SECONDS", "5"))
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+# Metrics for /metrics. Each worker process keeps its own; scrape every worker
+metrics_registry = Registry()
+TOOL_CALLS = metrics_registry.counter(
+    "weather_tool_calls_total", "MCP tool calls by tool and outcome.", ("tool", "outcome"))
+TOOL_DURATION = metrics_registry.histogram(
+    "weather_tool_duration_seconds", "MCP tool call latency.", ("tool",))
+TOOL_IN_FLIGHT = metrics_registry.gauge(
+    "weather_tool_in_flight", "MCP tool calls in progress.", ("tool",))
+UPSTREAM_REQUESTS = metrics_registry.counter(
+    "weather_upstream_requests_total",
+    "OpenWeatherMap requests by endpoint and HTTP status ('error' when no response arrived).",
+    ("endpoint", "status"))
+UPSTREAM_DURATION = metrics_registry.histogram(
+    "weather_upstream_duration_seconds", "OpenWeatherMap request latency.", ("endpoint",))
+UPSTREAM_IN_FLIGHT = metrics_registry.gauge(
+    "weather_upstream_in_flight", "OpenWeatherMap requests in progress.", ("endpoint",))
+UPSTREAM_RETRIES = metrics_registry.counter(
+    "weather_upstream_retries_total", "OpenWeatherMap requests retried after a 429, 5xx or network error.",
+    ("endpoint",))
+UPSTREAM_REJECTED = metrics_registry.counter(
+    "weather_upstream_rejected_total",
+    "Upstream calls not made, by reason ('rate_limited' or 'circuit_open').", ("reason",))
+STALE_SERVED = metrics_registry.counter(
+    "weather_stale_served_total", "Expired cache entries served because the upstream was unavailable.")
+metrics_registry.gauge(
+    "weather_upstream_circuit_state", "Upstream circuit breaker state: 0 closed, 1 half-open, 2 open.",
+    callback=lambda: {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1,
+                      CircuitBreaker.OPEN: 2}[upstream_breaker.state])
+metrics_registry.counter(
+    "weather_cache_lookups_total", "Weather cache lookups by result.", ("result",),
+    callback=lambda: {(result,): weather_cache.stats()[key] for result, key in
+                      (("hit", "hits"), ("stale_hit", "stale_hits"), ("miss", "misses"))})
+metrics_registry.counter(
+    "weather_cache_coalesced_total", "Cache misses that joined an upstream fetch already in flight.",
+    callback=lambda: weather_cache.stats()["coalesced"])
+metrics_registry.counter(
+    "weather_cache_refreshes_total", "Background refreshes of stale cache entries.",
+    callback=lambda: weather_cache.stats()["refreshes"])
+metrics_registry.gauge(
+    "weather_cache_hit_ratio", "Share of cache lookups served from the cache since startup.",
+    callback=lambda: weather_cache.stats()["hit_ratio"])
+metrics_registry.gauge(
+    "weather_cache_entries", "Cities in the weather cache.",
+    callback=lambda: weather_cache.stats()["entries"])
+metrics_registry.gauge(
+    "weather_cache_inflight_fetches", "Upstream fetches the cache is waiting on.",
+    callback=lambda: weather_cache.stats()["inflight"])
+WARM_REFRESHES = metrics_registry.counter(
+    "weather_cache_warm_refreshes_total", "Hot cities refreshed ahead of expiry, by outcome.",
+    ("outcome",))
+metrics_registry.gauge(
+    "weather_hot_cities", "Cities whose request frequency is being tracked for cache warming.",
+    callback=lambda: len(hot_cities))
+
+
+def tracked_tool(func):
+    """Record calls, latency and in-flight count of an MCP tool in the metrics."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with track(TOOL_CALLS, TOOL_DURATION, TOOL_IN_FLIGHT, tool=func.__name__):
+            return await func(*args, **kwargs)
+    return wrapper
+
+
+def retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> Optional[float]:
     """
-    Get current weather for a city.
+    Seconds to wait before retry number `attempt` + 1: the response's Retry-After when it has
+    one, otherwise exponential backoff with jitter. None when Retry-After asks for longer than
+    OPENWEATHER_RETRY_MAX_BACKOFF_SECONDS, since holding the tool call that long helps no one.
+    """
+    retry_after = response.headers.get(
+        "Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(
+                    retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                delay = None
+        if delay is not None:
+            delay = max(0.0, delay)
+            return delay if delay <= OPENWEATHER_RETRY_MAX_BACKOFF_SECONDS else None
+
+    backoff = min(OPENWEATHER_RETRY_MAX_BACKOFF_SECONDS,
+                  OPENWEATHER_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+    # Jitter spreads out the retries of requests that failed together
+    return backoff * random.uniform(0.5, 1)
+
+
+async def upstream_get(endpoint: str, url: str, params: Dict[str, Any]) -> httpx.Response:
+    """
+    GET from the upstream API through the rate limiter and circuit breaker, retrying 429, 5xx
+    and network errors with backoff.
+
+    Returns the last response, which may still be an error status for the caller to handle.
+
+    Raises:
+        CircuitOpenError: The upstream has been failing; no request was made
+        RateLimitExceededError: No request slot freed up within the limiter's wait
+        httpx.RequestError: The last attempt got no response
+    """
+    try:
+        upstream_breaker.before_call()
+    except CircuitOpenError:
+        UPSTREAM_REJECTED.inc(reason="circuit_open")
+        raise
+
+    try:
+        for attempt in range(OPENWEATHER_MAX_RETRIES + 1):
+            if upstream_rate_limiter is not None:
+                try:
+                    await upstream_rate_limiter.acquire()
+                except RateLimitExceededError:
+                    UPSTREAM_REJECTED.inc(reason="rate_limited")
+                    # Only a request that actually failed counts against the upstream
+                    if attempt:
+                        upstream_breaker.record_failure()
+                    else:
+                        upstream_breaker.release()
+                    raise
+
+            try:
+                response = await _send(endpoint, url, params)
+            except httpx.RequestError:
+                if attempt == OPENWEATHER_MAX_RETRIES:
+                    upstream_breaker.record_failure()
+                    raise
+                delay = retry_delay(attempt)
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    upstream_breaker.record_success()
+                    return response
+                delay = retry_delay(attempt, response)
+                if attempt == OPENWEATHER_MAX_RETRIES or delay is None:
+                    upstream_breaker.record_failure()
+                    return response
+
+            UPSTREAM_RETRIES.inc(endpoint=endpoint)
+            await asyncio.sleep(delay)
+    except asyncio.CancelledError:
+        # The caller went away; that says nothing about the upstream
+        upstream_breaker.release()
+        raise
+
+
+async def _send(endpoint: str, url: str, params: Dict[str, Any]) -> httpx.Response:
+    """GET on the shared client, recording latency and status in the metrics."""
+    UPSTREAM_IN_FLIGHT.inc(endpoint=endpoint)
+    start = time.perf_counter()
+    status = "error"
+    try:
+        response = await get_http_client().get(url, params=params)
+        status = str(response.status_code)
+        return response
+    finally:
+        UPSTREAM_DURATION.observe(
+            time.perf_counter() - start, endpoint=endpoint)
+        UPSTREAM_REQUESTS.inc(endpoint=endpoint, status=status)
+        UPSTREAM_IN_FLIGHT.dec(endpoint=endpoint)
+
+
+def format_weather(weather_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Pick the fields returned by the weather tools out of an OpenWeatherMap current weather object."""
+    # Validate response structure
+    if "main" not in weather_data or "weather" not in weather_data or not weather_data["weather"]:
+        raise ValueError(
+            "Invalid response structure from OpenWeatherMap API")
+
+    # Extract and format key information with safe access
+    return {
+        "city": weather_data.get("name", "Unknown"),
+        "country": weather_data.get("sys", {}).get("country", "Unknown"),
+        "temperature": {
+            "current": weather_data["main"]["temp"],
+            "feels_like": weather_data["main"]["feels_like"],
+            "min": weather_data["main"]["temp_min"],
+            "max": weather_data["main"]["temp_max"],
+            "unit": "°C"
+        },
+        "weather": {
+            "main": weather_data["weather"][0]["main"],
+            "description": weather_data["weather"][0]["description"]
+        },
+        "humidity": weather_data["main"]["humidity"],
+        "pressure": weather_data["main"]["pressure"],
+        "visibility": weather_data.get("visibility", "N/A"),
+        "wind": {
+            "speed": weather_data.get("wind", {}).get("speed", 0),
+            "direction": weather_data.get("wind", {}).get("deg", "N/A")
+        },
+        "clouds": weather_data.get("clouds", {}).get("all", 0),
+        "coordinates": {
+            "latitude": weather_data.get("coord", {}).get("lat", 0),
+            "longitude": weather_data.get("coord", {}).get("lon", 0)
+        }
+    }
+
+
+# Every leaf of a format_weather result, as dotted paths for the tools' `fields` parameter
+WEATHER_FIELDS = (
+    "city", "country",
+    "temperature.current", "temperature.feels_like", "temperature.min", "temperature.max",
+    "temperature.unit", "weather.main", "weather.description", "humidity", "pressure",
+    "visibility", "wind.speed", "wind.direction", "clouds",
+    "coordinates.latitude", "coordinates.longitude",
+)
+# Added to results served from an expired cache entry; kept by every projection
+STALE_FIELDS = ("stale", "age_seconds")
+
+
+def validate_fields(fields: Optional[List[str]]):
+    """Raise ValueError for a `fields` entry that is neither a field nor a group like "temperature"."""
+    for field in fields or []:
+        if field not in WEATHER_FIELDS and not any(name.startswith(field + ".") for name in WEATHER_FIELDS):
+            raise ValueError(
+                f"Unknown field '{field}'. Available fields: {', '.join(WEATHER_FIELDS)}")
+
+
+def project_weather(weather: Dict[str, Any], fields: Optional[List[str]] = None,
+                    compact: bool = False) -> Dict[str, Any]:
+    """
+    Shape a format_weather result for a tool response.
 
     Args:
-        city: The name of the city to get weather for
-        country_code: Optional ISO 3166 country code (e.g., 'us', 'uk')
-        ctx: Context for logging and progress reporting
+        weather: The full result
+        fields: Dotted paths to keep (e.g. ["city", "temperature.current"]); a group such as
+            "temperature" keeps all of its fields. None keeps everything.
+        compact: Return a flat dict keyed by dotted path instead of nested dicts
 
     Returns:
-        Dictionary containing weather information
+        The selected fields, plus "stale" and "age_seconds" when the result is stale
     """
-    # Get API key from environment
-    api_key = os.getenv("OPENWEATHER_API_KEY")
-    if not api_key:
-        error_msg = "OpenWeatherMap API key not found. Please set OPENWEATHER_API_KEY environment variable."
-        if ctx:
-            await ctx.error(error_msg)
-        raise ValueError("OpenWeatherMap API key not configured")
+    if fields is None and not compact:
+        return weather
+    selected = [name for name in WEATHER_FIELDS
+                if fields is None or any(name == field or name.startswith(field + ".") for field in fields)]
+    projected: Dict[str, Any] = {}
+    for name in selected:
+        value: Any = weather
+        for part in name.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        if compact:
+            projected[name] = value
+        else:
+            *parents, leaf = name.split(".")
+            target = projected
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = value
+    for name in STALE_FIELDS:
+        if name in weather:
+            projected[name] = weather[name]
+    return projected
 
-    # Build query string
-    if country_code:
-        query = f"{city},{country_code}"
-    else:
-        query = city
 
+async def fetch_current_weather(query: str, api_key: str) -> Dict[str, Any]:
+    """
+    Fetch current weather for a query from OpenWeatherMap and format the result.
+
+    Args:
+        query: The OpenWeatherMap `q` parameter, e.g. "London" or "London,uk"
+        api_key: The OpenWeatherMap API key
+
+    Returns:
+        Dictionary containing weather information
+
+    Raises:
+        ValueError: With a user-facing message when the lookup fails
+        UpstreamUnavailableError: (a ValueError) When the upstream is rate limiting, failing or
+            unreachable, so a cached result may be served instead
+    """
     # API endpoint
-    url = "https://api.openweathermap.org/data/2.5/weather"
+    url = f"{OPENWEATHER_BASE_URL}/weather"
     params = {
         "q": query,
         "appid": api_key,
         "units": "metric"  # Use metric units for temperature
     }
 
-    if ctx:
-        await ctx.info(f"Fetching weather data for {query}")
-
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-
-            weather_data = response.json()
-
-            # Validate response structure
-            if "main" not in weather_data or "weather" not in weather_data or not weather_data["weather"]:
-                raise ValueError(
-                    "Invalid response structure from OpenWeatherMap API")
-
-            # Extract and format key information with safe access
-            result = {
-                "city": weather_data.get("name", "Unknown"),
-                "country": weather_data.get("sys", {}).get("country", "Unknown"),
-                "temperature": {
-                    "current": weather_data["main"]["temp"],
-                    "feels_like": weather_data["main"]["feels_like"],
-                    "min": weather_data["main"]["temp_min"],
-                    "max": weather_data["main"]["temp_max"],
-                    "unit": "°C"
-                },
-                "weather": {
-                    "main": weather_data["weather"][0]["main"],
-                    "description": weather_data["weather"][0]["description"]
-                },
-                "humidity": weather_data["main"]["humidity"],
-                "pressure": weather_data["main"]["pressure"],
-                "visibility": weather_data.get("visibility", "N/A"),
-                "wind": {
-                    "speed": weather_data.get("wind", {}).get("speed", 0),
-                    "direction": weather_data.get("wind", {}).get("deg", "N/A")
-                },
-                "clouds": weather_data.get("clouds", {}).get("all", 0),
-                "coordinates": {
-                    "latitude": weather_data.get("coord", {}).get("lat", 0),
-                    "longitude": weather_data.get("coord", {}).get("lon", 0)
-                }
-            }
-
-            if ctx:
-                await ctx.info(f"Successfully retrieved weather data for {result['city']}, {result['country']}")
-
-            return result
+        response = await upstream_get("weather", url, params)
+        response.raise_for_status()
+        return format_weather(response.json())
+
+    except UpstreamUnavailableError:
+        raise
 
     except httpx.HTTPStatusError as e:
         error_msg = f"HTTP error {e.response.status_code} when fetching weather data"
@@ -111,23 +470,442 @@ async def get_weather(city: str, country_code: str = "", ctx: Optional[Context]
             error_msg = f"City '{query}' not found"
         elif e.response.status_code == 401:
             error_msg = "Invalid API key"
-
-        if ctx:
-            await ctx.error(error_msg)
+        elif e.response.status_code in RETRY_STATUS_CODES:
+            raise UpstreamUnavailableError(error_msg)
         raise ValueError(error_msg)
 
     except httpx.RequestError as e:
-        error_msg = f"Network error when fetching weather data: {str(e)}"
-        if ctx:
-            await ctx.error(error_msg)
+        raise UpstreamUnavailableError(
+            f"Network error when fetching weather data: {str(e)}")
+
+    except Exception as e:
+        raise ValueError(f"Unexpected error: {str(e)}")
+
+
+async def fetch_group_weather(city_ids: List[int], api_key: str) -> Dict[int, Dict[str, Any]]:
+    """
+    Fetch current weather for up to 20 OpenWeatherMap city IDs in one request.
+
+    Args:
+        city_ids: The OpenWeatherMap city IDs
+        api_key: The OpenWeatherMap API key
+
+    Returns:
+        Weather information keyed by city ID; IDs the API did not return are left out
+
+    Raises:
+        ValueError: With a user-facing message when the lookup fails
+        UpstreamUnavailableError: (a ValueError) When the upstream is rate limiting, failing or
+            unreachable
+    """
+    url = f"{OPENWEATHER_BASE_URL}/group"
+    params = {
+        "id": ",".join(str(city_id) for city_id in city_ids),
+        "appid": api_key,
+        "units": "metric"
+    }
+
+    try:
+        response = await upstream_get("group", url, params)
+        response.raise_for_status()
+        return {item["id"]: format_weather(item) for item in response.json().get("list", [])}
+
+    except UpstreamUnavailableError:
+        raise
+
+    except httpx.HTTPStatusError as e:
+        error_msg = f"HTTP error {e.response.status_code} when fetching weather data"
+        if e.response.status_code == 401:
+            error_msg = "Invalid API key"
+        elif e.response.status_code in RETRY_STATUS_CODES:
+            raise UpstreamUnavailableError(error_msg)
         raise ValueError(error_msg)
 
+    except httpx.RequestError as e:
+        raise UpstreamUnavailableError(
+            f"Network error when fetching weather data: {str(e)}")
+
     except Exception as e:
-        error_msg = f"Unexpected error: {str(e)}"
+        raise ValueError(f"Unexpected error: {str(e)}")
+
+
+def get_api_key() -> str:
+    api_key = os.getenv("OPENWEATHER_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "OpenWeatherMap API key not found. Please set OPENWEATHER_API_KEY environment variable.")
+    return api_key
+
+
+def serve_stale(key: Any, error: UpstreamUnavailableError) -> Dict[str, Any]:
+    """
+    Return the last cached weather for `key`, however old, marked with "stale" and its age.
+    Re-raises `error` when nothing was ever cached for it.
+    """
+    entry = weather_cache.peek(key)
+    if entry is None:
+        raise error
+    STALE_SERVED.inc()
+    return {**entry.value, "stale": True, "age_seconds": round(entry.age)}
+
+
+async def lookup_city(city: str, country_code: str, api_key: str) -> Dict[str, Any]:
+    """
+    Return the weather for a city through the cache; identical concurrent lookups share one
+    upstream call. While the upstream is unavailable, an expired entry is served as stale.
+    """
+    query = f"{city},{country_code}" if country_code else city
+    key = normalize_query(city, country_code)
+    try:
+        result = await weather_cache.get_or_fetch(key, lambda: fetch_current_weather(query, api_key))
+    except UpstreamUnavailableError as e:
+        result = serve_stale(key, e)
+    # Only cities that exist are worth keeping warm
+    hot_cities.record(key, query)
+    return result
+
+
+async def lookup_city_ids(city_ids: List[int], api_key: str) -> Dict[int, Any]:
+    """
+    Return the weather (or a ValueError) for each city ID. Fresh cached entries are used as-is;
+    the rest are fetched through the /group endpoint in chunks of 20, falling back to stale
+    entries for a chunk the upstream could not answer.
+    """
+    results: Dict[int, Any] = {}
+    missing = []
+    for city_id in dict.fromkeys(city_ids):
+        cached = weather_cache.get(("id", city_id))
+        if cached is not None:
+            results[city_id] = cached
+        else:
+            missing.append(city_id)
+
+    chunks = [missing[i:i + GROUP_MAX_IDS]
+              for i in range(0, len(missing), GROUP_MAX_IDS)]
+    fetched = await asyncio.gather(*(fetch_group_weather(chunk, api_key) for chunk in chunks),
+                                   return_exceptions=True)
+    for chunk, weather in zip(chunks, fetched):
+        for city_id in chunk:
+            if isinstance(weather, UpstreamUnavailableError):
+                try:
+                    results[city_id] = serve_stale(("id", city_id), weather)
+                except UpstreamUnavailableError as e:
+                    results[city_id] = e
+            elif isinstance(weather, Exception):
+                results[city_id] = weather
+            elif city_id in weather:
+                weather_cache.set(("id", city_id), weather[city_id])
+                results[city_id] = weather[city_id]
+            else:
+                results[city_id] = ValueError(
+                    f"City ID {city_id} not found")
+    return results
+
+
+@server.tool(
+    name="get_weather",
+    description=(
+        "Get current weather information for a city using OpenWeatherMap API. Pass `fields` "
+        "(dotted paths such as 'temperature.current') to return only those fields, and "
+        "`compact` to get a flat object keyed by those paths."
+    )
+)
+@tracked_tool
+async def get_weather(
+    city: str,
+    country_code: str = "",
+    fields: Optional[List[str]] = None,
+    compact: bool = False,
+    ctx: Optional[Context] = None,
+) -> Dict[str, Any]:
+    """
+    Get current weather for a city.
+
+    Args:
+        city: The name of the city to get weather for
+        country_code: Optional ISO 3166 country code (e.g., 'us', 'uk')
+        fields: Optional dotted paths to return (e.g. ['city', 'temperature.current']);
+            all fields by default
+        compact: Return a flat dictionary keyed by dotted path instead of nested dictionaries
+        ctx: Context for logging and progress reporting
+
+    Returns:
+        Dictionary containing weather information
+    """
+    validate_fields(fields)
+
+    try:
+        api_key = get_api_key()
+    except ValueError as e:
         if ctx:
-            await ctx.error(error_msg)
-        raise ValueError(error_msg)
+            await ctx.error(str(e))
+        raise ValueError("OpenWeatherMap API key not configured")
+
+    if ctx:
+        query = f"{city},{country_code}" if country_code else city
+        await ctx.info(f"Fetching weather data for {query}")
+
+    try:
+        result = await lookup_city(city, country_code, api_key)
+    except ValueError as e:
+        if ctx:
+            await ctx.error(str(e))
+        raise
+
+    if ctx and result.get("stale"):
+        await ctx.warning(f"Weather service unavailable; returning data from {result['age_seconds']}s ago")
+    elif ctx:
+        await ctx.info(f"Successfully retrieved weather data for {result['city']}, {result['country']}")
+
+    return project_weather(result, fields, compact)
+
+
+@server.tool(
+    name="get_weather_many",
+    description=(
+        "Get current weather for several cities in one call. Pass cities as 'City' or 'City,CC' "
+        "strings, and/or OpenWeatherMap city IDs when they are known. `fields` and `compact` "
+        "shape each city's weather as in get_weather."
+    )
+)
+@tracked_tool
+async def get_weather_many(
+    cities: Optional[List[str]] = None,
+    city_ids: Optional[List[int]] = None,
+    fields: Optional[List[str]] = None,
+    compact: bool = False,
+    ctx: Optional[Context] = None,
+) -> Dict[str, Any]:
+    """
+    Get current weather for several cities at once.
+
+    Args:
+        cities: City names, each optionally followed by a comma and an ISO 3166 country code
+            (e.g. ['London,uk', 'Paris'])
+        city_ids: OpenWeatherMap city IDs, looked up 20 at a time with the /group endpoint
+        fields: Optional dotted paths to return for each city, as in get_weather
+        compact: Return each city's weather as a flat dictionary keyed by dotted path
+        ctx: Context for logging and progress reporting
+
+    Returns:
+        Dictionary with one result per requested city, in request order. Each result has the
+        request ("city" or "city_id") and either "weather" or "error", so one bad city does
+        not fail the others.
+    """
+    cities = cities or []
+    city_ids = city_ids or []
+    if len(cities) + len(city_ids) > WEATHER_MANY_MAX_CITIES:
+        raise ValueError(
+            f"At most {WEATHER_MANY_MAX_CITIES} cities can be requested at once")
+    validate_fields(fields)
+
+    try:
+        api_key = get_api_key()
+    except ValueError as e:
+        if ctx:
+            await ctx.error(str(e))
+        raise ValueError("OpenWeatherMap API key not configured")
+
+    if ctx:
+        await ctx.info(f"Fetching weather data for {len(cities) + len(city_ids)} cities")
+
+    semaphore = asyncio.Semaphore(WEATHER_MANY_MAX_CONCURRENCY)
+
+    async def lookup(entry: str) -> Dict[str, Any]:
+        city, _, country_code = entry.partition(",")
+        try:
+            async with semaphore:
+                weather = await lookup_city(city.strip(), country_code.strip(), api_key)
+            return {"city": entry, "weather": project_weather(weather, fields, compact)}
+        except ValueError as e:
+            return {"city": entry, "error": str(e)}
+
+    by_name, by_id = await asyncio.gather(
+        asyncio.gather(*(lookup(entry) for entry in cities)),
+        lookup_city_ids(city_ids, api_key),
+    )
+
+    results = list(by_name)
+    for city_id in city_ids:
+        weather = by_id[city_id]
+        if isinstance(weather, Exception):
+            results.append({"city_id": city_id, "error": str(weather)})
+        else:
+            results.append({"city_id": city_id, "weather": project_weather(
+                weather, fields, compact)})
+
+    failed = sum(1 for result in results if "error" in result)
+    if ctx and failed:
+        await ctx.warning(f"{failed} of {len(results)} lookups failed")
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
+
+
+@server.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> PlainTextResponse:
+    """Prometheus metrics for this process."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@server.custom_route("/cache/stats", methods=["GET"])
+async def cache_stats(request: Request) -> JSONResponse:
+    """Report cache hit/miss counters and configuration."""
+    return JSONResponse(weather_cache.stats())
+
+
+# How often /readyz re-checks that the upstream API answers; checks run in the background
+UPSTREAM_PROBE_INTERVAL_SECONDS = float(
+    os.getenv("UPSTREAM_PROBE_INTERVAL_SECONDS", "30"))
+
+# Set while the app lifespan is running, so /readyz reports not ready during startup and shutdown
+_started_at: Optional[float] = None
+_upstream_status: Dict[str, Any] = {
+    "reachable": None, "checked_at": None, "latency_ms": None, "error": None}
+_upstream_probe: Optional[asyncio.Task] = None
+
+
+async def probe_upstream():
+    """Record whether the upstream API answers at all. Any non-5xx response counts as reachable."""
+    start = time.perf_counter()
+    try:
+        response = await get_http_client().get(f"{OPENWEATHER_BASE_URL}/weather", timeout=5)
+        reachable = response.status_code < 500
+        error = None if reachable else f"HTTP {response.status_code}"
+    except httpx.HTTPError as e:
+        reachable, error = False, str(e) or type(e).__name__
+    _upstream_status.update(reachable=reachable, checked_at=time.time(), error=error,
+                            latency_ms=round((time.perf_counter() - start) * 1000, 1))
+
+
+def refresh_upstream_status():
+    """Start a background upstream probe if the last result is older than the probe interval."""
+    global _upstream_probe
+    if _upstream_probe is not None and not _upstream_probe.done():
+        return
+    checked_at = _upstream_status["checked_at"]
+    # A failed probe is retried sooner, so readiness recovers quickly once the upstream is back
+    interval = UPSTREAM_PROBE_INTERVAL_SECONDS if _upstream_status["reachable"] else min(
+        UPSTREAM_PROBE_INTERVAL_SECONDS, 2)
+    if checked_at is None or time.time() - checked_at >= interval:
+        _upstream_probe = asyncio.create_task(probe_upstream())
+
+
+@server.custom_route("/healthz", methods=["GET"])
+async def healthz(request: Request) -> JSONResponse:
+    """Liveness: the process is up and serving HTTP."""
+    return JSONResponse({"status": "ok"})
+
+
+@server.custom_route("/readyz", methods=["GET"])
+async def readyz(request: Request) -> JSONResponse:
+    """
+    Readiness: the app has started, the API key is set and the upstream API was not found
+    unreachable by the last background probe. Never waits on the upstream itself; until the
+    first probe finishes, reachability is reported as unknown (null) and does not block readiness.
+    """
+    if _started_at is not None:
+        refresh_upstream_status()
+    checks = {
+        "started": _started_at is not None,
+        "api_key": bool(os.getenv("OPENWEATHER_API_KEY")),
+        "upstream": _upstream_status["reachable"] is not False,
+    }
+    ready = all(checks.values())
+    cache = weather_cache.stats()
+    return JSONResponse({
+        "status": "ready" if ready else "not ready",
+        "checks": checks,
+        "uptime_seconds": round(time.time() - _started_at, 3) if _started_at else None,
+        "upstream": {"url": OPENWEATHER_BASE_URL, "circuit": upstream_breaker.state, **_upstream_status},
+        "cache": {key: cache[key] for key in ("backend", "entries", "inflight", "hit_ratio")},
+    }, status_code=200 if ready else 503)
+
+
+async def warm_hot_cities():
+    """Refresh the WEATHER_WARM_TOP_N most requested cities whose entries expire within WEATHER_WARM_AHEAD_SECONDS."""
+    api_key = os.getenv("OPENWEATHER_API_KEY")
+    # Leave a failing upstream alone; lookups are already falling back to stale data
+    if not api_key or upstream_breaker.state != CircuitBreaker.CLOSED:
+        return
+
+    refresh_after = max(0, weather_cache.ttl_seconds - WEATHER_WARM_AHEAD_SECONDS)
+
+    def is_due(key) -> bool:
+        entry = weather_cache.peek(key)
+        return entry is None or entry.age >= refresh_after
+
+    due = [(key, query) for key, query in hot_cities.hottest(WEATHER_WARM_TOP_N) if is_due(key)]
+    semaphore = asyncio.Semaphore(WEATHER_WARM_MAX_CONCURRENCY)
+
+    async def warm(key, query: str):
+        async with semaphore:
+            try:
+                # A lookup (or another worker, with the SQLite cache) may have refreshed it meanwhile
+                if not is_due(key):
+                    return
+                await weather_cache.refresh(key, lambda: fetch_current_weather(query, api_key))
+                WARM_REFRESHES.inc(outcome="ok")
+            except Exception as e:
+                WARM_REFRESHES.inc(outcome="error")
+                logger.warning("Warm refresh of %s failed: %s", query, e)
+
+    await asyncio.gather(*(warm(key, query) for key, query in due))
+
+
+async def run_cache_warmer():
+    """
+    Every WEATHER_WARM_INTERVAL_SECONDS, age the request counts and warm the hottest cities.
+
+    With several workers sharing the SQLite cache, every worker records its requests in the same
+    database, and only the worker holding the "cache_warmer" lease ages the counts and warms the
+    cache, so each city is refreshed once per interval rather than once per worker. Another worker
+    takes over if the holder stops renewing the lease.
+    """
+    decay = 0.5 ** (WEATHER_WARM_INTERVAL_SECONDS /
+                    max(weather_cache.ttl_seconds, WEATHER_WARM_INTERVAL_SECONDS))
+    holder = f"{socket.gethostname()}:{os.getpid()}"
+    while True:
+        await asyncio.sleep(WEATHER_WARM_INTERVAL_SECONDS)
+        try:
+            if weather_cache.try_lease("cache_warmer", holder, 2 * WEATHER_WARM_INTERVAL_SECONDS):
+                hot_cities.decay(decay)
+                await warm_hot_cities()
+        except Exception:
+            # Keep warming on later intervals; lookups still work without it
+            logger.exception("Cache warming failed")
+
+
+def create_app() -> Starlette:
+    """Build the streamable HTTP ASGI app with the shared upstream client and cache warmer tied to its lifespan."""
+    app = server.streamable_http_app()
+    mcp_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app):
+        global _started_at, _cache_warmer
+        async with http_client_lifespan():
+            async with mcp_lifespan(app) as state:
+                _started_at = time.time()
+                refresh_upstream_status()
+                if WEATHER_WARM_INTERVAL_SECONDS > 0:
+                    _cache_warmer = asyncio.create_task(run_cache_warmer())
+                try:
+                    yield state
+                finally:
+                    _started_at = None
+                    if _upstream_probe is not None:
+                        _upstream_probe.cancel()
+                    if _cache_warmer is not None:
+                        _cache_warmer.cancel()
+                        _cache_warmer = None
+
+    app.router.lifespan_context = lifespan
+    return app
 
 
 if __name__ == "__main__":
-    server.run(transport="streamable-http")
+    uvicorn.run(
+        create_app(),
+        host=server.settings.host,
+        port=server.settings.port,
+        log_level=server.settings.log_level.lower(),
+    )